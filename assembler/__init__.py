@@ -0,0 +1,387 @@
+from typing import List, Dict, Tuple, Union, Optional, Iterable, Iterator, Callable
+from dataclasses import dataclass
+from struct import pack
+import re
+
+from generator.writer import Instruction, Text, Item
+
+
+class AssembleError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Register:
+    number: int
+    width: int
+    rex: bool = False  # spl, bpl, sil, dil は REX が無いと ah などになる
+
+
+@dataclass(frozen=True)
+class Memory:
+    base: Optional[int]
+    index: Optional[int]
+    scale: int
+    disp: int
+    width: Optional[int]  # byte / word / dword / qword の指定が無ければ None
+
+
+Operand = Union[Register, Memory, int, str]  # int は即値, str はラベル
+
+names64 = ['rax', 'rcx', 'rdx', 'rbx', 'rsp', 'rbp', 'rsi', 'rdi']
+registers: Dict[str, Register] = {}
+for n, name in enumerate(names64):
+    registers[name] = Register(n, 64)
+    registers['e' + name[1:]] = Register(n, 32)
+    registers[name[1:]] = Register(n, 16)
+for n, name in enumerate(['al', 'cl', 'dl', 'bl']):
+    registers[name] = Register(n, 8)
+for n, name in enumerate(['spl', 'bpl', 'sil', 'dil'], 4):
+    registers[name] = Register(n, 8, True)
+for n in range(8, 16):
+    registers.update({f'r{n}': Register(n, 64), f'r{n}d': Register(n, 32),
+                      f'r{n}w': Register(n, 16), f'r{n}b': Register(n, 8)})
+
+widths = {'qword': 64, 'dword': 32, 'word': 16, 'byte': 8}
+scales = {1: 0, 2: 1, 4: 2, 8: 3}
+term_re = re.compile(r'[+-]|[^+\s-]+')
+alu_ops = {'add': 0, 'or': 1, 'and': 4, 'sub': 5, 'xor': 6, 'cmp': 7}
+shift_ops = {'shl': 4, 'shr': 5, 'sar': 7}
+
+
+def memory(text: str) -> Memory:
+    # '[rbp - 8]', 'qword [rax + rdi*4 + 16]' など
+    size, _, inner = text.partition('[')
+    size = size.strip()
+    if size and size not in widths:
+        raise AssembleError(f'unknown operand size: {size}')
+    base = index = None
+    scale, disp, sign = 1, 0, 1
+    for term in term_re.findall(inner.rstrip().rstrip(']')):
+        if term in '+-':
+            sign *= -1 if term == '-' else 1
+            continue
+        if '*' in term:
+            r, s = term.split('*')
+            if r not in registers:
+                r, s = s, r
+            if index is not None or r not in registers or int(s) not in scales:
+                raise AssembleError(f'bad index: {text}')
+            index, scale = registers[r].number, int(s)
+        elif term in registers:
+            if sign < 0:
+                raise AssembleError(f'cannot subtract a register: {text}')
+            if base is None:
+                base = registers[term].number
+            elif index is None:
+                index = registers[term].number
+            else:
+                raise AssembleError(f'too many registers: {text}')
+        else:
+            disp += sign * int(term, 0)
+        sign = 1
+    if index == 4:
+        if scale != 1 or base == 4:
+            raise AssembleError(f'rsp cannot be an index: {text}')
+        base, index = index, base
+    if not -1 << 31 <= disp < 1 << 31:
+        raise AssembleError(f'displacement out of range: {text}')
+    return Memory(base, index, scale, disp, widths[size] if size else None)
+
+
+def operand(text: str) -> Operand:
+    text = text.strip()
+    if '[' in text:
+        return memory(text)
+    if text in registers:
+        return registers[text]
+    try:
+        return int(text, 0)
+    except ValueError:
+        return text
+
+
+def parse(asm: str) -> Iterator[Item]:
+    # nasm のテキストを writer と同じ Item に戻す. キャッシュに残したアセンブリを組み立てるときに使う
+    for line in asm.splitlines():
+        line = line.split(';', 1)[0].strip()
+        if not line:
+            continue
+        if line.endswith(':') or line.startswith(('section ', 'global ')):
+            yield Text(line)
+            continue
+        op, _, rest = line.partition(' ')
+        yield Instruction(op, tuple(o.strip() for o in rest.split(',')) if rest.strip() else ())
+
+
+def modrm(reg: int, rm: Union[Register, Memory]) -> Tuple[int, bytes]:
+    # (REX の R X B, ModRM 以降のバイト列)
+    if isinstance(rm, Register):
+        return (reg >> 3) << 2 | rm.number >> 3, bytes([0xc0 | (reg & 7) << 3 | rm.number & 7])
+    rex = (reg >> 3) << 2
+    r = (reg & 7) << 3
+    index = 4 if rm.index is None else rm.index & 7  # SIB の index 100 は index 無し
+    if rm.index is not None:
+        rex |= (rm.index >> 3) << 1
+    sib_scale = scales[rm.scale] << 6
+    if rm.base is None:
+        return rex, bytes([0x04 | r, sib_scale | index << 3 | 5]) + pack('<i', rm.disp)
+    rex |= rm.base >> 3
+    base = rm.base & 7
+    if rm.disp == 0 and base != 5:
+        mod, disp = 0, b''
+    elif -128 <= rm.disp < 128:
+        mod, disp = 1, pack('<b', rm.disp)
+    else:
+        mod, disp = 2, pack('<i', rm.disp)
+    if rm.index is None and base != 4:
+        return rex, bytes([mod << 6 | r | base]) + disp
+    return rex, bytes([mod << 6 | r | 4, sib_scale | index << 3 | base]) + disp
+
+
+def immediate(value: int, width: int) -> bytes:
+    # 64bit 命令の即値は 32bit を符号拡張したもの
+    if width == 64:
+        if not -1 << 31 <= value < 1 << 31:
+            raise AssembleError(f'immediate out of range: {value}')
+        return pack('<i', value)
+    if not -1 << (width - 1) <= value < 1 << width:
+        raise AssembleError(f'immediate out of range: {value}')
+    return (value & ((1 << width) - 1)).to_bytes(width // 8, 'little')
+
+
+def is_byte(value: int) -> bool:
+    return -128 <= value < 128
+
+
+class Assembler:
+    # writer の命令列を nasm を通さずに機械語にする. CodeGenerator たちの使う命令だけを扱う
+    code: bytearray
+    labels: Dict[str, int]
+    fixups: List[Tuple[int, str]]  # rel32 を書く位置と飛び先
+    scope: str  # .label は直前の普通のラベルの下に付く (nasm と同じ)
+    encoders: Dict[str, Callable[['Assembler', List[Operand]], None]]
+
+    def __init__(self) -> None:
+        self.code = bytearray()
+        self.labels = {}
+        self.fixups = []
+        self.scope = ''
+
+    def feed(self, items: Iterable[Item]) -> None:
+        for item in items:
+            if isinstance(item, Instruction):
+                self.instruction(item)
+            else:
+                self.text(item.text)
+
+    def text(self, text: str) -> None:
+        text = text.strip()
+        if not text or text.startswith((';', 'global ')):
+            return
+        if text.startswith('section '):
+            if text.split()[1] != '.text':
+                raise AssembleError(f'unsupported section: {text}')
+            return
+        if not text.endswith(':'):
+            raise AssembleError(f'unknown directive: {text}')
+        name = self.label(text[:-1])
+        if name in self.labels:
+            raise AssembleError(f'duplicate label: {name}')
+        self.labels[name] = len(self.code)
+        if not name.startswith('.'):
+            self.scope = name
+
+    def label(self, name: str) -> str:
+        return self.scope + name if name.startswith('.') else name
+
+    def instruction(self, ins: Instruction) -> None:
+        encoder = self.encoders.get(ins.op)
+        if encoder is None:
+            raise AssembleError(f'unknown instruction: {ins}')
+        try:
+            encoder(self, [operand(o) for o in ins.operands])
+        except (AssembleError, ValueError, TypeError, KeyError) as e:
+            raise AssembleError(f'cannot encode {ins}: {e}')
+
+    def link(self) -> bytes:
+        code = bytearray(self.code)
+        for position, name in self.fixups:
+            if name not in self.labels:
+                raise AssembleError(f'undefined label: {name}')
+            code[position:position + 4] = pack('<i', self.labels[name] - (position + 4))
+        return bytes(code)
+
+    @property
+    def entry(self) -> int:
+        if '_start' not in self.labels:
+            raise AssembleError('no _start label')
+        return self.labels['_start']
+
+    def put(self, width: int, opcode: bytes, reg: int, rm: Union[Register, Memory],
+            tail: bytes = b'', rex: bool = False) -> None:
+        # [66] [REX] opcode ModRM [SIB] [disp] [imm]
+        bits, rest = modrm(reg, rm)
+        rex = rex or (isinstance(rm, Register) and rm.rex)
+        self.raw(width, opcode, bits, rex, rest + tail)
+
+    def raw(self, width: int, opcode: bytes, bits: int = 0, rex: bool = False, tail: bytes = b'') -> None:
+        if width == 16:
+            self.code.append(0x66)
+        if width == 64 or bits or rex:
+            self.code.append(0x40 | (8 if width == 64 else 0) | bits)
+        self.code += opcode
+        self.code += tail
+
+    @staticmethod
+    def width(*operands: Operand) -> int:
+        for o in operands:
+            if isinstance(o, Register):
+                return o.width
+            if isinstance(o, Memory) and o.width is not None:
+                return o.width
+        raise AssembleError('operand size not specified')
+
+    @staticmethod
+    def rm(o: Operand) -> Union[Register, Memory]:
+        if not isinstance(o, (Register, Memory)):
+            raise AssembleError(f'expected a register or memory: {o}')
+        return o
+
+    @staticmethod
+    def register(o: Operand) -> Register:
+        if not isinstance(o, Register):
+            raise AssembleError(f'expected a register: {o}')
+        return o
+
+    def mov(self, operands: List[Operand]) -> None:
+        dst, src = operands
+        width = self.width(dst, src)
+        byte = width == 8
+        if isinstance(src, int):
+            if isinstance(dst, Register):
+                if width == 64 and 0 <= src < 1 << 32:
+                    # nasm と同じく 32bit の mov にする. 上位 32bit は 0 になる
+                    width = 32
+                if width < 64 or not -1 << 31 <= src < 1 << 31:
+                    if width == 64:
+                        tail = (src & 0xffffffffffffffff).to_bytes(8, 'little')
+                    else:
+                        tail = immediate(src, width)
+                    self.raw(width, bytes([(0xb0 if byte else 0xb8) | dst.number & 7]),
+                             dst.number >> 3, dst.rex, tail)
+                    return
+            self.put(width, b'\xc6' if byte else b'\xc7', 0, self.rm(dst), immediate(src, width))
+        elif isinstance(src, Register):
+            self.put(width, b'\x88' if byte else b'\x89', src.number, self.rm(dst), rex=src.rex)
+        else:
+            dst = self.register(dst)
+            self.put(width, b'\x8a' if byte else b'\x8b', dst.number, self.rm(src), rex=dst.rex)
+
+    def movzx(self, operands: List[Operand]) -> None:
+        dst, src = self.register(operands[0]), self.rm(operands[1])
+        source_width = self.width(src)
+        if source_width not in (8, 16):
+            raise AssembleError('movzx needs a byte or word source')
+        self.put(dst.width, b'\x0f\xb6' if source_width == 8 else b'\x0f\xb7', dst.number, src)
+
+    def lea(self, operands: List[Operand]) -> None:
+        dst, src = self.register(operands[0]), operands[1]
+        if not isinstance(src, Memory):
+            raise AssembleError('lea needs an address')
+        self.put(dst.width, b'\x8d', dst.number, src)
+
+    def alu(self, n: int, operands: List[Operand]) -> None:
+        dst, src = operands
+        width = self.width(dst, src)
+        byte = width == 8
+        if isinstance(src, int):
+            if byte:
+                self.put(width, b'\x80', n, self.rm(dst), immediate(src, 8))
+            elif is_byte(src):
+                self.put(width, b'\x83', n, self.rm(dst), pack('<b', src))
+            else:
+                self.put(width, b'\x81', n, self.rm(dst), immediate(src, width))
+        elif isinstance(src, Register):
+            self.put(width, bytes([n << 3 | (0 if byte else 1)]), src.number, self.rm(dst), rex=src.rex)
+        else:
+            dst = self.register(dst)
+            self.put(width, bytes([n << 3 | (2 if byte else 3)]), dst.number, self.rm(src), rex=dst.rex)
+
+    def imul(self, operands: List[Operand]) -> None:
+        dst = self.register(operands[0])
+        if len(operands) == 2:
+            self.put(dst.width, b'\x0f\xaf', dst.number, self.rm(operands[1]))
+            return
+        src, value = self.rm(operands[1]), operands[2]
+        if not isinstance(value, int):
+            raise AssembleError(f'expected an immediate: {value}')
+        if is_byte(value):
+            self.put(dst.width, b'\x6b', dst.number, src, pack('<b', value))
+        else:
+            self.put(dst.width, b'\x69', dst.number, src, immediate(value, dst.width))
+
+    def mul(self, operands: List[Operand]) -> None:
+        src = self.rm(operands[0])
+        width = self.width(src)
+        self.put(width, b'\xf6' if width == 8 else b'\xf7', 4, src)
+
+    def shift(self, n: int, operands: List[Operand]) -> None:
+        dst, count = self.rm(operands[0]), operands[1]
+        if not isinstance(count, int):
+            raise AssembleError(f'expected an immediate: {count}')
+        width = self.width(dst)
+        if count == 1:
+            self.put(width, b'\xd0' if width == 8 else b'\xd1', n, dst)
+        else:
+            self.put(width, b'\xc0' if width == 8 else b'\xc1', n, dst, immediate(count, 8))
+
+    def push(self, operands: List[Operand]) -> None:
+        src = operands[0]
+        if isinstance(src, int):
+            if is_byte(src):
+                self.raw(32, b'\x6a', tail=pack('<b', src))
+            else:
+                self.raw(32, b'\x68', tail=immediate(src, 64))
+            return
+        src = self.register(src)
+        if src.width != 64:
+            raise AssembleError('push needs a 64bit register')
+        self.raw(32, bytes([0x50 | src.number & 7]), src.number >> 3)
+
+    def pop(self, operands: List[Operand]) -> None:
+        dst = self.register(operands[0])
+        if dst.width != 64:
+            raise AssembleError('pop needs a 64bit register')
+        self.raw(32, bytes([0x58 | dst.number & 7]), dst.number >> 3)
+
+    def call(self, operands: List[Operand]) -> None:
+        target = operands[0]
+        if not isinstance(target, str):
+            raise AssembleError(f'expected a label: {target}')
+        self.code.append(0xe8)
+        self.fixups.append((len(self.code), self.label(target)))
+        self.code += bytes(4)
+
+    encoders = {
+        'mov': mov,
+        'movzx': movzx,
+        'lea': lea,
+        'imul': imul,
+        'mul': mul,
+        'push': push,
+        'pop': pop,
+        'call': call,
+        'leave': lambda self, operands: self.raw(32, b'\xc9'),
+        'ret': lambda self, operands: self.raw(32, b'\xc3'),
+        'syscall': lambda self, operands: self.raw(32, b'\x0f\x05'),
+        **{op: (lambda n: lambda self, operands: self.alu(n, operands))(n) for op, n in alu_ops.items()},
+        **{op: (lambda n: lambda self, operands: self.shift(n, operands))(n) for op, n in shift_ops.items()},
+    }
+
+
+def assemble(items: Iterable[Item]) -> Tuple[bytes, int]:
+    # (機械語, _start の位置)
+    assembler = Assembler()
+    assembler.feed(items)
+    return assembler.link(), assembler.entry
@@ -0,0 +1,35 @@
+from struct import pack
+import os
+
+base_address = 0x400000
+header_size = 64 + 56  # ELF ヘッダ + プログラムヘッダ 1 つ
+
+
+def executable(code: bytes, entry: int) -> bytes:
+    # セクションヘッダの無い, 読み取り + 実行の LOAD セグメント 1 つだけの静的な ELF64
+    size = header_size + len(code)
+    ident = b'\x7fELF' + bytes([2, 1, 1, 0]) + bytes(8)  # 64bit, little endian, SYSV
+    elf_header = ident + pack('<HHIQQQIHHHHHH',
+                              2,  # ET_EXEC
+                              0x3e,  # x86-64
+                              1,
+                              base_address + header_size + entry,
+                              64,  # プログラムヘッダの位置
+                              0,
+                              0,
+                              64, 56, 1,
+                              64, 0, 0)
+    program_header = pack('<IIQQQQQQ',
+                          1,  # PT_LOAD
+                          5,  # PF_R | PF_X
+                          0,
+                          base_address, base_address,
+                          size, size,
+                          0x1000)
+    return elf_header + program_header + code
+
+
+def write_executable(path: str, code: bytes, entry: int) -> None:
+    with open(path, 'wb') as f:
+        f.write(executable(code, entry))
+    os.chmod(path, 0o755)
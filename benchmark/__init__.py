@@ -0,0 +1,27 @@
+from typing import Callable, Any
+from time import perf_counter
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def sample_source(size: int) -> str:
+    statements = ['aa = 0x1f * (bb + 3ul);\n',
+                  'dd = 017 * cc + aa;\n',
+                  'zz = yy = xx + 0b101 + 42LL;\n',
+                  '( aa )*bb+cc ;\n']
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        s = statements[i % len(statements)]
+        lines.append(s)
+        length += len(s)
+        i += 1
+    return ''.join(lines)
@@ -0,0 +1,55 @@
+from sys import argv
+from typing import List, Any, Callable
+import tracemalloc
+
+from tokenor import Tokenizer
+from nodor import parse
+from nodor.arena import NodeArena
+from ir.lower import Lowerer
+from engine import compile_program
+from . import measure, sample_source
+
+
+def allocated(fn: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def to_arena(nodes: List[Any]) -> NodeArena:
+    arena = NodeArena()
+    arena.extend(nodes)
+    return arena
+
+
+def check_round_trip(nodes: List[Any]) -> None:
+    # arena から組み立て直した木も, 後ろの段 (IR への lower と engine) で元の木と同じ結果になる
+    arena = NodeArena()
+    rebuilt = [arena.to_node(root) for root in arena.extend(nodes)]
+    assert str(Lowerer().lower(rebuilt)) == str(Lowerer().lower(nodes))
+    assert compile_program(rebuilt).run() == compile_program(nodes).run()
+
+
+def count_kinds(arena: NodeArena) -> int:
+    return sum(1 for k in arena.kinds if k)
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"nodes":>9} {"dataclass":>10} {"arena":>9} {"ratio":>6} {"scan s":>7}')
+    for kb in sizes_kb:
+        tokens = Tokenizer.tokenize(sample_source(kb * 1024))
+        objects = allocated(lambda: parse(tokens))
+        nodes = parse(tokens)
+        check_round_trip(nodes)
+        arena = to_arena(nodes)
+        packed = allocated(lambda: to_arena(nodes))
+        scan = measure(lambda: count_kinds(arena))
+        print(f'{kb:>6}KB {len(arena):>9} {objects // 1024:>8}KB {packed // 1024:>7}KB '
+              f'{objects / packed:>6.1f} {scan:>7.3f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [64, 256, 1024])
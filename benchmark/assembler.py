@@ -0,0 +1,50 @@
+from sys import argv
+from typing import List, Optional
+from io import StringIO
+from tempfile import TemporaryDirectory
+from shutil import which
+import os
+import subprocess
+
+from tokenor import Tokenizer
+from nodor import parse
+from generator.writer import AsmWriter
+from generator.register import RegisterCodeGenerator
+from assembler import Assembler
+from assembler.elf import write_executable
+from . import measure, sample_source
+
+
+def builtin(code: str, path: str) -> None:
+    assembler = Assembler()
+    writer = AsmWriter(annotate=False, sink=assembler.feed)
+    RegisterCodeGenerator(writer=writer).generate(parse(Tokenizer.tokenize(code)))
+    write_executable(path, assembler.link(), assembler.entry)
+
+
+def external(code: str, path: str) -> None:
+    out = StringIO()
+    RegisterCodeGenerator(writer=AsmWriter(out, annotate=False)).generate(parse(Tokenizer.tokenize(code)))
+    with open(path + '.s', 'w') as f:
+        f.write(out.getvalue())
+    subprocess.run(['nasm', '-f', 'elf64', '-o', path + '.o', path + '.s'], check=True)
+    subprocess.run(['ld', '-o', path, path + '.o'], check=True)
+
+
+def main(sizes_kb: List[int]) -> None:
+    # nasm が無ければ組み込みの方だけ測る
+    has_nasm = which('nasm') is not None and which('ld') is not None
+    print(f'{"source":>8} {"builtin s":>10} {"nasm+ld s":>10} {"binary KB":>10}')
+    with TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'a.out')
+        for kb in sizes_kb:
+            code = sample_source(kb * 1024)
+            builtin_time = measure(lambda: builtin(code, path))
+            size = os.path.getsize(path)
+            external_time: Optional[float] = measure(lambda: external(code, path)) if has_nasm else None
+            print(f'{kb:>6}KB {builtin_time:>10.4f} '
+                  f'{"-" if external_time is None else f"{external_time:.4f}":>10} {size / 1024:>10.1f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [1, 4, 64])
@@ -0,0 +1,35 @@
+from sys import argv
+from time import perf_counter
+
+from tokenor import Tokenizer
+from nodor import parse
+from engine import compile_program
+from engine.batch import np, run_batch, random_batch
+from . import sample_source
+
+
+def main(rows: int, kb: int) -> None:
+    if np is None:
+        print('numpy is not installed')
+        return
+    nodes = parse(Tokenizer.tokenize(sample_source(kb * 1024)))
+    values = random_batch(rows)
+    start = perf_counter()
+    rax, memory = run_batch(nodes, values)
+    batch_time = perf_counter() - start
+
+    # 先頭の何行かは 1 行ずつの engine と突き合わせる. batch は型の幅で wrap する
+    program = compile_program(nodes, wrap_to_type=True)
+    sample = min(rows, 1000)
+    start = perf_counter()
+    for i in range(sample):
+        expected, after = program.run([int(v) for v in values[i]])
+        assert int(rax[i]) == expected and [int(v) for v in memory[i]] == after, f'row {i} differs'
+    row_time = (perf_counter() - start) / sample
+
+    print(f'{rows} rows x {kb}KB: batch {batch_time:.3f}s ({batch_time / rows * 1e9:.0f} ns/row), '
+          f'engine {row_time * 1e6:.1f} us/row, speedup {row_time * rows / batch_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 1_000_000, int(argv[2]) if len(argv) > 2 else 1)
@@ -0,0 +1,48 @@
+from sys import argv
+from typing import List
+from io import StringIO
+from tempfile import TemporaryDirectory
+import os
+
+from tokenor import Tokenizer
+from nodor import parse
+from generator.writer import AsmWriter
+from generator.register import RegisterCodeGenerator
+from cache import CompileCache, Entry
+from ir.lower import Lowerer
+from engine import compile_program
+from . import measure, sample_source
+
+
+def cold(code: str) -> Entry:
+    tokens = Tokenizer.tokenize(code)
+    nodes = parse(tokens)
+    out = StringIO()
+    RegisterCodeGenerator(writer=AsmWriter(out, annotate=False)).generate(nodes)
+    return Entry(tokens, nodes, out.getvalue())
+
+
+def check_round_trip(entry: Entry, stored: Entry) -> None:
+    # 読み戻した AST (arena から組み立て直したもの) も後ろの段で同じ結果になる
+    assert str(Lowerer().lower(stored.nodes)) == str(Lowerer().lower(entry.nodes))  # type: ignore
+    assert compile_program(stored.nodes).run() == compile_program(entry.nodes).run()  # type: ignore
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"compile s":>10} {"store s":>8} {"warm s":>8} {"entry KB":>9}')
+    with TemporaryDirectory() as directory:
+        cache = CompileCache(directory)
+        for kb in sizes_kb:
+            code = sample_source(kb * 1024)
+            key = cache.key(code.encode(), ())
+            compile_time = measure(lambda: cold(code))
+            entry = cold(code)
+            store_time = measure(lambda: cache.put(key, entry))
+            warm_time = measure(lambda: cache.get(key))
+            check_round_trip(entry, cache.get(key))  # type: ignore
+            size = os.path.getsize(cache.path(key))
+            print(f'{kb:>6}KB {compile_time:>10.3f} {store_time:>8.3f} {warm_time:>8.4f} {size / 1024:>9.0f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [4, 64, 256])
@@ -0,0 +1,42 @@
+from sys import argv
+from typing import List, Tuple, Callable
+from io import StringIO
+
+from tokenor import Tokenizer
+from nodor import parse
+from generator import CodeGenerator
+from generator.writer import AsmWriter
+from generator.register import RegisterCodeGenerator
+from . import sample_source
+
+
+def count(text: str) -> Tuple[int, int]:
+    instructions = 0
+    memory = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(';') or line.endswith(':') or line.startswith(('section', 'global')):
+            continue
+        instructions += 1
+        if '[' in line or line.startswith(('push', 'pop')):
+            memory += 1
+    return instructions, memory
+
+
+def generated(code: str, generator: Callable[..., CodeGenerator]) -> str:
+    out = StringIO()
+    generator(writer=AsmWriter(out, annotate=False)).generate(parse(Tokenizer.tokenize(code)))
+    return out.getvalue()
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"generator":>10} {"instructions":>13} {"memory ops":>11}')
+    for kb in sizes_kb:
+        code = sample_source(kb * 1024)
+        for name, generator in (('stack', CodeGenerator), ('register', RegisterCodeGenerator)):
+            instructions, memory = count(generated(code, generator))
+            print(f'{kb:>6}KB {name:>10} {instructions:>13} {memory:>11}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [4, 64])
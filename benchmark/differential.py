@@ -0,0 +1,92 @@
+from sys import argv
+from typing import List, Tuple
+from argparse import Namespace
+from io import StringIO
+from tempfile import TemporaryDirectory
+import os
+import subprocess
+
+from tokenor.source import SourceMap
+from assembler import Assembler, parse as parse_asm
+from assembler.elf import write_executable
+from engine import frame_size, compile_program, to_frame
+from driver import front, optimize, code_generator
+from .programs import ProgramSpec, generate
+
+# 終了直前 (最後の leave の前) に変数の領域と rax をそのまま標準出力に書く
+dump = ['mov r12, rax',
+        'mov rax, 1', 'mov rdi, 1', f'lea rsi, [rbp - {frame_size}]', f'mov rdx, {frame_size}', 'syscall',
+        'push r12',
+        'mov rax, 1', 'mov rdi, 1', 'mov rsi, rsp', 'mov rdx, 8', 'syscall',
+        'pop rax']
+
+# 32bit / 64bit の境目で wrap の仕方が出やすい文
+edge_cases = ['bb = 65536 * 65536;\n',
+              'bb = 0xffffffff + 1;\n',
+              'cc = 65536; bb = cc * 65536;\n',
+              'aa = 0xffffffff + 1; bb = aa;\n',
+              'bb = (aa = 0x80000000 * 2) + 0 * bb;\n',
+              'bb = cc * (65536 * 65536);\n']
+
+
+def options(optimize: bool, stack_machine: bool = False, ir: bool = False) -> Namespace:
+    return Namespace(source_lines=False, release=True, optimize=optimize, stack_machine=stack_machine, ir=ir)
+
+
+# 同じ結果になるはずの組. AST の generator は 64bit で計算し, IR はノードの型の幅で計算する.
+# 3 番目が True のものはバイナリを作らず, --run と同じく engine で実行する
+groups: List[List[Tuple[str, Namespace, bool]]] = [
+    [('stack', options(False, stack_machine=True), False), ('stack -O', options(True, stack_machine=True), False),
+     ('register', options(False), False), ('register -O', options(True), False),
+     ('run', options(False), True), ('run -O', options(True), True)],
+    [('ir', options(False, ir=True), False), ('ir -O', options(True, ir=True), False),
+     ('run --ir', options(False, ir=True), True), ('run --ir -O', options(True, ir=True), True)],
+]
+
+
+def instrument(asm: str) -> str:
+    lines = asm.split('\n')
+    end = max(i for i, line in enumerate(lines) if line.strip() == 'leave')
+    lines[end:end] = ['    ' + line for line in dump]
+    return '\n'.join(lines)
+
+
+def native(code: str, args: Namespace, path: str) -> Tuple[int, bytes]:
+    # (rax, 変数の領域)
+    source_map = SourceMap(code)
+    tokens, nodes = front(code, source_map)
+    out = StringIO()
+    code_generator(args, source_map, tokens, out).generate(optimize(args, nodes))
+    assembler = Assembler()
+    assembler.feed(parse_asm(instrument(out.getvalue())))
+    write_executable(path, assembler.link(), assembler.entry)
+    output = subprocess.run([path], stdout=subprocess.PIPE).stdout
+    return int.from_bytes(output[frame_size:], 'little'), output[:frame_size]
+
+
+def in_process(code: str, args: Namespace) -> Tuple[int, bytes]:
+    _, nodes = front(code, SourceMap(code))
+    rax, values = compile_program(optimize(args, nodes), wrap_to_type=args.ir).run()
+    return rax, to_frame(values)
+
+
+def main(programs: int, statements: int) -> int:
+    sources = edge_cases + [generate(ProgramSpec(statements=statements, seed=seed)) for seed in range(programs)]
+    mismatches = 0
+    with TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'a.out')
+        for code in sources:
+            for group in groups:
+                results = [(name, in_process(code, args) if engine else native(code, args, path))
+                           for name, args, engine in group]
+                _, expected = results[0]
+                for name, result in results[1:]:
+                    if result != expected:
+                        mismatches += 1
+                        print(f'{results[0][0]} != {name} : {code!r}')
+    print(f'{len(sources)} programs, {mismatches} mismatches')
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    exit(main(int(argv[1]) if len(argv) > 1 else 100, int(argv[2]) if len(argv) > 2 else 8))
@@ -0,0 +1,40 @@
+from sys import argv
+from typing import List
+from argparse import Namespace
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import os
+
+from driver import compile_files
+from . import sample_source
+
+
+def options() -> Namespace:
+    return Namespace(stream=False, source_lines=False, release=True, optimize=True, stack_machine=False,
+                     ir=False, cache=None, cache_size=64, elf=False, keep_asm=False)
+
+
+def main(files: int, kb: int, jobs: List[int]) -> None:
+    print(f'{files} files x {kb}KB, {os.cpu_count()} CPUs')
+    print(f'{"jobs":>4} {"wall s":>8} {"cpu s":>8} {"speedup":>8}')
+    with TemporaryDirectory() as directory:
+        code = sample_source(kb * 1024)
+        paths = []
+        for i in range(files):
+            path = os.path.join(directory, f'{i}.c')
+            with open(path, 'w') as f:
+                f.write(code)
+            paths.append(path)
+        serial = 0.0
+        for j in jobs:
+            start = perf_counter()
+            results = compile_files(paths, options(), j)
+            wall = perf_counter() - start
+            assert all(r.error is None for r in results)
+            serial = serial or wall
+            print(f'{j:>4} {wall:>8.3f} {sum(r.seconds for r in results):>8.3f} {serial / wall:>8.2f}')
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 32, int(argv[2]) if len(argv) > 2 else 16,
+         [int(i) for i in argv[3:]] or [1, 2, 4])
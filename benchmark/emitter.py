@@ -0,0 +1,27 @@
+from sys import argv
+from typing import List
+from os import devnull
+from io import StringIO
+
+from tokenor import Tokenizer
+from nodor import parse
+from generator import CodeGenerator
+from generator.writer import AsmWriter
+from . import measure, sample_source
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"nodes":>8} {"annotated s":>12} {"release s":>10} {"lines/s":>10}')
+    with open(devnull, 'w') as out:
+        for kb in sizes_kb:
+            nodes = parse(Tokenizer.tokenize(sample_source(kb * 1024)))
+            text = StringIO()
+            CodeGenerator(writer=AsmWriter(text, annotate=False)).generate(nodes)
+            count = text.getvalue().count('\n')
+            annotated = measure(lambda: CodeGenerator(writer=AsmWriter(out)).generate(nodes))
+            release = measure(lambda: CodeGenerator(writer=AsmWriter(out, annotate=False)).generate(nodes))
+            print(f'{kb:>6}KB {len(nodes):>8} {annotated:>12.3f} {release:>10.3f} {count / release:>10.0f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [64, 256, 1024])
@@ -0,0 +1,45 @@
+from sys import argv
+from typing import List, Tuple
+from tempfile import TemporaryDirectory
+import os
+import subprocess
+
+from tokenor import Tokenizer
+from nodor import parse
+from generator.writer import AsmWriter
+from generator.register import RegisterCodeGenerator
+from assembler import Assembler
+from assembler.elf import write_executable
+from engine import compile_program, to_frame
+from . import measure, sample_source
+from .differential import options, native as instrumented
+
+
+def native(code: str, path: str) -> int:
+    assembler = Assembler()
+    writer = AsmWriter(annotate=False, sink=assembler.feed)
+    RegisterCodeGenerator(writer=writer).generate(parse(Tokenizer.tokenize(code)))
+    write_executable(path, assembler.link(), assembler.entry)
+    return subprocess.run([path]).returncode
+
+
+def in_process(code: str) -> Tuple[int, bytes]:
+    # (rax, 変数の領域). 終了コードだけでなく全部をバイナリと比べる
+    rax, values = compile_program(parse(Tokenizer.tokenize(code))).run()
+    return rax, to_frame(values)
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"native s":>10} {"engine s":>10} {"run only s":>11}')
+    with TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'a.out')
+        for kb in sizes_kb:
+            code = sample_source(kb * 1024)
+            assert instrumented(code, options(False), path) == in_process(code)
+            program = compile_program(parse(Tokenizer.tokenize(code)))
+            print(f'{kb:>6}KB {measure(lambda: native(code, path)):>10.4f} {measure(lambda: in_process(code)):>10.4f} '
+                  f'{measure(program.run):>11.5f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [1, 4, 64])
@@ -0,0 +1,48 @@
+from sys import argv
+from typing import List, Callable, Tuple, Optional
+from io import StringIO
+
+from tokenor import Tokenizer
+from nodor import parse
+from generator import CodeGenerator
+from generator.writer import AsmWriter
+from generator.register import RegisterCodeGenerator
+from ir.backend import IRCodeGenerator
+from ir.ssa import mem2reg
+from ir.dse import DeadStoreEliminator
+from ir.isel import fold_immediates
+from .codegen import count
+from . import measure, sample_source
+
+generators: List[Tuple[str, Callable[[AsmWriter], object]]] = [
+    ('stack', lambda writer: CodeGenerator(writer=writer)),
+    ('register', lambda writer: RegisterCodeGenerator(writer=writer)),
+    ('ir', lambda writer: IRCodeGenerator(writer)),
+    ('ir+ssa', lambda writer: IRCodeGenerator(writer, [mem2reg])),
+    ('ir+dse', lambda writer: IRCodeGenerator(writer, [DeadStoreEliminator()])),
+    ('ir+imm', lambda writer: IRCodeGenerator(writer, [fold_immediates, DeadStoreEliminator()])),
+    ('ir+all', lambda writer: IRCodeGenerator(writer, [mem2reg, fold_immediates, DeadStoreEliminator()])),
+]
+
+
+def generated(code: str, generator: Callable[[AsmWriter], object]) -> Tuple[str, Optional[int]]:
+    out = StringIO()
+    g = generator(AsmWriter(out, annotate=False))
+    g.generate(parse(Tokenizer.tokenize(code)))  # type: ignore
+    return out.getvalue(), g.backend.cost if isinstance(g, IRCodeGenerator) else None
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"generator":>10} {"instructions":>13} {"memory ops":>11} {"op cost":>8} {"s":>8}')
+    for kb in sizes_kb:
+        code = sample_source(kb * 1024)
+        for name, generator in generators:
+            text, cost = generated(code, generator)
+            instructions, memory = count(text)
+            seconds = measure(lambda: generated(code, generator))
+            print(f'{kb:>6}KB {name:>10} {instructions:>13} {memory:>11} {"-" if cost is None else cost:>8} '
+                  f'{seconds:>8.3f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [4, 64])
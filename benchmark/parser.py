@@ -0,0 +1,35 @@
+from sys import argv
+from typing import List
+
+from tokenor import Tokenizer
+from nodor.parser import Parser
+from . import measure
+
+
+def expression_source(statements: int) -> str:
+    lines = []
+    for i in range(statements):
+        lines.append(f'aa = (bb + {i}) * cc + (dd * (ee + 0x{i:x}) + ff) * {i % 7}u;\n')
+    return ''.join(lines)
+
+
+def nested_source(depth: int) -> str:
+    return '(' * depth + 'aa' + ')' * depth + ' + ' + 'bb = ' * depth + '1;\n'
+
+
+def main(counts: List[int]) -> None:
+    print(f'{"statements":>10} {"tokens":>9} {"seconds":>8} {"tokens/s":>10}')
+    for n in counts:
+        tokens = Tokenizer.tokenize(expression_source(n))
+        sec = measure(lambda: Parser().parse(tokens))
+        print(f'{n:>10} {len(tokens):>9} {sec:>8.3f} {len(tokens) / sec:>10.0f}')
+
+    print(f'{"depth":>10} {"tokens":>9} {"seconds":>8} {"tokens/s":>10}')
+    for n in counts:
+        tokens = Tokenizer.tokenize(nested_source(n))
+        sec = measure(lambda: Parser().parse(tokens))
+        print(f'{n:>10} {len(tokens):>9} {sec:>8.3f} {len(tokens) / sec:>10.0f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [1000, 10000, 100000])
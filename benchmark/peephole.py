@@ -0,0 +1,38 @@
+from sys import argv
+from typing import List, Callable
+from io import StringIO
+
+from tokenor import Tokenizer
+from nodor import parse
+from generator import CodeGenerator
+from generator.writer import AsmWriter
+from generator.register import RegisterCodeGenerator
+from generator.peephole import Peephole
+from .codegen import count, generated
+from . import measure, sample_source
+
+
+def optimized(code: str, generator: Callable[..., CodeGenerator], peephole: Peephole) -> str:
+    out = StringIO()
+    generator(writer=AsmWriter(out, annotate=False, passes=[peephole])).generate(parse(Tokenizer.tokenize(code)))
+    return out.getvalue()
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"generator":>10} {"instructions":>13} {"after":>8} {"memory ops":>11} {"after":>8} '
+          f'{"plain s":>8} {"peephole s":>11}')
+    for kb in sizes_kb:
+        code = sample_source(kb * 1024)
+        for name, generator in (('stack', CodeGenerator), ('register', RegisterCodeGenerator)):
+            peephole = Peephole()
+            before = count(generated(code, generator))
+            after = count(optimized(code, generator, peephole))
+            plain = measure(lambda: generated(code, generator))
+            passed = measure(lambda: optimized(code, generator, Peephole()))
+            print(f'{kb:>6}KB {name:>10} {before[0]:>13} {after[0]:>8} {before[1]:>11} {after[1]:>8} '
+                  f'{plain:>8.3f} {passed:>11.3f}')
+            print(f'{"":>19} ' + ', '.join(f'{rule}: {fired}' for rule, fired in peephole.stats.most_common()))
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [4, 64])
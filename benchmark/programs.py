@@ -0,0 +1,104 @@
+from typing import List, Tuple, Dict, Any
+from dataclasses import dataclass, asdict
+from string import ascii_lowercase
+import random
+
+variables: Tuple[str, ...] = tuple(c * 2 for c in ascii_lowercase)
+literal_styles: Tuple[str, ...] = ('decimal', 'hex', 'octal', 'binary')
+suffixes: Tuple[str, ...] = ('u', 'U', 'l', 'L', 'ul', 'lu', 'LL', 'll', 'ull', 'uLL', 'LLU')
+
+
+@dataclass
+class ProgramSpec:
+    # 文法の範囲 (整数リテラル, 変数, + * = と括弧) のプログラムを seed から決まった形で作る
+    statements: int = 100
+    depth: int = 4  # 式の木の最大の深さ
+    literals: Tuple[str, ...] = literal_styles  # 使うリテラルの書き方
+    suffix_ratio: float = 0.3  # リテラルに u / l / ll などを付ける割合
+    identifiers: Tuple[str, ...] = variables  # 使う変数名 (aa だけが 32bit)
+    variable_ratio: float = 0.5  # 葉が変数になる割合
+    assign_ratio: float = 0.5  # 文が代入になる割合
+    seed: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ProgramGenerator:
+    spec: ProgramSpec
+    random: random.Random
+
+    def __init__(self, spec: ProgramSpec) -> None:
+        self.spec = spec
+        self.random = random.Random(spec.seed)
+
+    def literal(self) -> str:
+        r = self.random
+        # 小さい値が多く, たまに 32bit / 64bit の境目をまたぐ値
+        value = r.choice([r.randrange(16), r.randrange(1 << 8), r.randrange(1 << 16),
+                          r.randrange(1 << 31, 1 << 33), r.randrange(1 << 64)])
+        style = r.choice(self.spec.literals)
+        if style == 'hex':
+            text = r.choice(['0x', '0X']) + f'{value:x}'
+        elif style == 'octal':
+            text = f'0{value:o}'
+        elif style == 'binary':
+            text = r.choice(['0b', '0B']) + f'{value:b}'
+        else:
+            text = str(value)
+        if r.random() < self.spec.suffix_ratio:
+            text += r.choice(suffixes)
+        return text
+
+    def leaf(self) -> str:
+        if self.random.random() < self.spec.variable_ratio:
+            return self.random.choice(self.spec.identifiers)
+        return self.literal()
+
+    def expression(self, depth: int) -> str:
+        # 再帰を使わず, 葉を置き換えていって深さ depth までの木を作る
+        tree: List[str] = ['E']
+        for _ in range(depth):
+            grown: List[str] = []
+            for part in tree:
+                if part != 'E' or self.random.random() < 0.3:
+                    grown.append(part)
+                    continue
+                k = self.random.random()
+                if k < 0.35:
+                    grown += ['E', ' + ', 'E']
+                elif k < 0.7:
+                    grown += ['E', ' * ', 'E']
+                elif k < 0.85:
+                    grown += ['(', 'E', ')']
+                else:
+                    grown += ['(', self.random.choice(self.spec.identifiers), ' = ', 'E', ')']
+            tree = grown
+        return ''.join(self.leaf() if part == 'E' else part for part in tree)
+
+    def statement(self) -> str:
+        target = ''
+        if self.random.random() < self.spec.assign_ratio:
+            target = self.random.choice(self.spec.identifiers) + ' = '
+        return target + self.expression(self.spec.depth) + ';\n'
+
+    def generate(self) -> str:
+        return ''.join(self.statement() for _ in range(self.spec.statements))
+
+    def generate_size(self, size: int) -> str:
+        # statements は無視して, size バイトを超えるまで文を足す
+        lines = []
+        length = 0
+        while length < size:
+            line = self.statement()
+            lines.append(line)
+            length += len(line)
+        return ''.join(lines)
+
+
+def generate(spec: ProgramSpec) -> str:
+    return ProgramGenerator(spec).generate()
+
+
+def generate_size(size: int, spec: ProgramSpec = ProgramSpec()) -> str:
+    return ProgramGenerator(spec).generate_size(size)
@@ -0,0 +1,39 @@
+from sys import argv
+from typing import List
+
+from nodor.node import Variable
+from nodor.variable_validator.scope import Scope
+from . import measure
+
+
+def nested_scope(names: int, depth: int) -> Scope:
+    scope = Scope()
+    for d in range(depth):
+        scope.enter()
+        for i in range(names // depth):
+            scope.declare(Variable(0, f'v{d}_{i}', None, None))
+    return scope
+
+
+def main(sizes: List[int]) -> None:
+    print(f'{"names":>8} {"depth":>6} {"lookups":>8} {"seconds":>8} {"ns/lookup":>10}')
+    for names in sizes:
+        depth = max(1, names // 10)
+        scope = nested_scope(names, depth)
+        # 外側のブロックの名前と組み込みの名前を引く
+        keys = [f'v0_{i}' for i in range(names // depth)] + ['aa', 'zz']
+        lookups = 100000
+        rounds = lookups // len(keys)
+
+        def run() -> None:
+            for _ in range(rounds):
+                for k in keys:
+                    scope.lookup(k)
+
+        sec = measure(run)
+        count = rounds * len(keys)
+        print(f'{names:>8} {depth:>6} {count:>8} {sec:>8.3f} {sec / count * 1e9:>10.0f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [100, 1000, 10000])
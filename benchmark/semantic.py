@@ -0,0 +1,24 @@
+from sys import argv
+from typing import List
+
+from tokenor import Tokenizer
+from nodor.parser import Parser
+from nodor.variable_validator import VariableValidator
+from nodor.typor import Typor
+from nodor.analyzer import Analyzer
+from . import measure, sample_source
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"validate":>9} {"typing":>8} {"separate":>9} {"fused":>7} {"ratio":>6}')
+    for kb in sizes_kb:
+        nodes = Parser().parse(Tokenizer.tokenize(sample_source(kb * 1024)))
+        validate = measure(lambda: VariableValidator().crawl(nodes))
+        typing = measure(lambda: Typor().typing(nodes))
+        fused = measure(lambda: Analyzer().analyze(nodes))
+        separate = validate + typing
+        print(f'{kb:>6}KB {validate:>9.3f} {typing:>8.3f} {separate:>9.3f} {fused:>7.3f} {separate / fused:>6.2f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [64, 256, 1024])
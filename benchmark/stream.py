@@ -0,0 +1,38 @@
+from sys import argv
+from typing import List, Callable
+from contextlib import redirect_stdout
+from os import devnull
+import tracemalloc
+
+from tokenor import Tokenizer, TokenStream
+from nodor import parse, parse_iter
+from generator import CodeGenerator
+from . import sample_source
+
+
+def batch(code: str) -> None:
+    CodeGenerator().generate(parse(Tokenizer.tokenize(code)))
+
+
+def stream(code: str) -> None:
+    CodeGenerator().generate(parse_iter(TokenStream(Tokenizer.tokenize_iter(code))))
+
+
+def peak(fn: Callable[[str], None], code: str) -> int:
+    with open(devnull, 'w') as out, redirect_stdout(out):
+        tracemalloc.start()
+        fn(code)
+        _, result = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"batch peak":>12} {"stream peak":>12}')
+    for kb in sizes_kb:
+        code = sample_source(kb * 1024)
+        print(f'{kb:>6}KB {peak(batch, code) // 1024:>10}KB {peak(stream, code) // 1024:>10}KB')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [64, 256, 1024])
@@ -0,0 +1,186 @@
+from typing import List, Dict, Tuple, Callable, Any, Optional
+from argparse import ArgumentParser, Namespace
+from io import StringIO
+from time import perf_counter
+import gc
+import json
+import math
+import platform
+import sys
+
+from tokenor import Tokenizer
+from nodor import parse
+from nodor.node import Node
+from nodor.parser import Parser
+from nodor.analyzer import Analyzer
+from nodor.optimizer import ConstantFolder
+from generator import CodeGenerator
+from generator.writer import AsmWriter, Item
+from generator.register import RegisterCodeGenerator
+from generator.peephole import Peephole
+from ir.backend import IRCodeGenerator
+from ir.ssa import mem2reg
+from ir.dse import DeadStoreEliminator
+from ir.isel import fold_immediates
+from assembler import assemble
+from engine import compile_program
+from .programs import ProgramSpec, generate_size, literal_styles, variables
+
+# (名前, 計らない下準備, 計る処理). 下準備は毎回やり直すので, 処理が入力を書き換えてもよい
+Phase = Tuple[str, Callable[[str], Any], Callable[[Any], Any]]
+
+
+def typed(code: str) -> List[Node]:
+    return parse(Tokenizer.tokenize(code))
+
+
+def writer() -> AsmWriter:
+    return AsmWriter(StringIO(), annotate=False)
+
+
+def items(code: str) -> List[Item]:
+    collected: List[Item] = []
+    RegisterCodeGenerator(writer=AsmWriter(annotate=False, sink=collected.extend)).generate(typed(code))
+    return collected
+
+
+phases: List[Phase] = [
+    ('tokenize', lambda code: code, Tokenizer.tokenize),
+    ('parse', Tokenizer.tokenize, lambda tokens: Parser().parse(tokens)),
+    ('analyze', lambda code: Parser().parse(Tokenizer.tokenize(code)), lambda nodes: Analyzer().analyze(nodes)),
+    ('fold', typed, lambda nodes: ConstantFolder().fold(nodes)),
+    ('stack', typed, lambda nodes: CodeGenerator(writer=writer()).generate(nodes)),
+    ('register', typed, lambda nodes: RegisterCodeGenerator(writer=writer()).generate(nodes)),
+    ('peephole', items, lambda items: Peephole()(items)),
+    ('ir', typed, lambda nodes: IRCodeGenerator(writer(), [mem2reg, fold_immediates, DeadStoreEliminator()])
+     .generate(nodes)),
+    ('assemble', items, assemble),
+    ('engine', typed, compile_program),
+]
+
+
+def measure_phase(phase: Phase, code: str, repeat: int) -> float:
+    _, setup, run = phase
+    best = float('inf')
+    for _ in range(repeat):
+        state = setup(code)
+        # timeit と同じく計っている間は GC を止める
+        gc.collect()
+        gc.disable()
+        try:
+            start = perf_counter()
+            run(state)
+            best = min(best, perf_counter() - start)
+        finally:
+            gc.enable()
+    return best
+
+
+def fit(sizes: List[int], seconds: List[float]) -> Tuple[float, float]:
+    # seconds = coefficient * size ** exponent を両対数の最小二乗で当てはめる. exponent が 1 なら線形
+    if len(sizes) < 2:
+        return 1.0, seconds[0] / sizes[0]
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in seconds]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mx) ** 2 for x in xs)
+    exponent = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var
+    return exponent, math.exp(my - exponent * mx)
+
+
+def run_suite(spec: ProgramSpec, sizes_kb: List[int], names: List[str], repeat: int) -> Dict[str, Any]:
+    selected = [p for p in phases if p[0] in names]
+    sources = [generate_size(kb * 1024, spec) for kb in sizes_kb]
+    sizes = [len(code) for code in sources]
+    results: Dict[str, Any] = {}
+    for phase in selected:
+        seconds = [measure_phase(phase, code, repeat) for code in sources]
+        exponent, coefficient = fit(sizes, seconds)
+        results[phase[0]] = {
+            'seconds': seconds,
+            'exponent': exponent,
+            'coefficient': coefficient,
+            'ns_per_byte': seconds[-1] / sizes[-1] * 1e9,
+        }
+    return {
+        'spec': spec.to_dict(),
+        'sizes': sizes,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'phases': results,
+    }
+
+
+def report(result: Dict[str, Any]) -> None:
+    sizes = result['sizes']
+    print(f'{"phase":>10} ' + ' '.join(f'{s // 1024:>7}KB' for s in sizes) + f' {"ns/B":>7} {"exponent":>8}')
+    for name, phase in result['phases'].items():
+        print(f'{name:>10} ' + ' '.join(f'{t:>9.4f}' for t in phase['seconds'])
+              + f' {phase["ns_per_byte"]:>7.0f} {phase["exponent"]:>8.2f}')
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> int:
+    # 同じ大きさ同士の時間の比 (今回 / 基準). tolerance を超えて遅くなったものを数える
+    if result['spec'] != baseline['spec']:
+        print('warning: the baseline was generated from a different program spec')
+    regressions = 0
+    common = [s for s in result['sizes'] if s in baseline['sizes']]
+    print(f'{"phase":>10} ' + ' '.join(f'{s // 1024:>7}KB' for s in common) + f' {"exponent":>14}')
+    for name, phase in result['phases'].items():
+        base = baseline['phases'].get(name)
+        if base is None:
+            continue
+        cells = []
+        for size in common:
+            ratio = phase['seconds'][result['sizes'].index(size)] / base['seconds'][baseline['sizes'].index(size)]
+            slower = ratio > 1 + tolerance
+            regressions += slower
+            cells.append(f'{ratio:>8.2f}{"!" if slower else " "}')
+        print(f'{name:>10} ' + ' '.join(cells) + f' {base["exponent"]:>6.2f} -> {phase["exponent"]:.2f}')
+    return regressions
+
+
+def arguments(argv: Optional[List[str]] = None) -> Namespace:
+    parser = ArgumentParser(prog='python -m benchmark.suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 16, 64], metavar='KB')
+    parser.add_argument('--phases', nargs='+', default=[p[0] for p in phases], choices=[p[0] for p in phases])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--literals', nargs='+', default=list(literal_styles), choices=literal_styles)
+    parser.add_argument('--suffix-ratio', type=float, default=0.3)
+    parser.add_argument('--identifiers', nargs='+', default=list(variables), choices=variables)
+    parser.add_argument('--variable-ratio', type=float, default=0.5)
+    parser.add_argument('--assign-ratio', type=float, default=0.5)
+    parser.add_argument('--save', metavar='JSON', help='write the results as a baseline')
+    parser.add_argument('--compare', metavar='JSON', help='compare against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='slowdown ratio above which a phase counts as a regression')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = arguments(argv)
+    spec = ProgramSpec(depth=args.depth, literals=tuple(args.literals), suffix_ratio=args.suffix_ratio,
+                       identifiers=tuple(args.identifiers), variable_ratio=args.variable_ratio,
+                       assign_ratio=args.assign_ratio, seed=args.seed)
+    result = run_suite(spec, args.sizes, args.phases, args.repeat)
+    report(result)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # JSON に入れると tuple は list になる
+        result = json.loads(json.dumps(result))
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f'{regressions} regressions')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+from sys import argv
+from typing import List, Any, Callable
+import tracemalloc
+
+from tokenor import Tokenizer
+from nodor.parser import Parser
+from . import measure, sample_source
+
+
+def allocated(fn: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main(sizes_kb: List[int]) -> None:
+    print(f'{"source":>8} {"tokens":>9} {"Token list":>11} {"TokenBuffer":>12} {"ratio":>6} {"parse s":>8}')
+    for kb in sizes_kb:
+        code = sample_source(kb * 1024)
+        tokens = Tokenizer.tokenize(code)
+        objects = allocated(lambda: list(Tokenizer.tokenize_iter(code)))
+        buffer = allocated(lambda: Tokenizer.tokenize(code))
+        parse = measure(lambda: Parser().parse(tokens))
+        print(f'{kb:>6}KB {len(tokens):>9} {objects // 1024:>9}KB {buffer // 1024:>10}KB '
+              f'{objects / buffer:>6.1f} {parse:>8.3f}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in argv[1:]] or [256, 1024, 4096])
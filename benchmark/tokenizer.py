@@ -0,0 +1,18 @@
+from sys import argv
+from typing import List
+
+from tokenor import Tokenizer
+from . import measure, sample_source
+
+
+def main(sizes_mb: List[float]) -> None:
+    print(f'{"size":>8} {"tokens":>10} {"seconds":>9} {"s/MB":>7}')
+    for mb in sizes_mb:
+        code = sample_source(int(mb * 1024 * 1024))
+        tokens = Tokenizer.tokenize(code)
+        sec = measure(lambda: Tokenizer.tokenize(code))
+        print(f'{mb:>6}MB {len(tokens):>10} {sec:>9.3f} {sec / mb:>7.3f}')
+
+
+if __name__ == '__main__':
+    main([float(i) for i in argv[1:]] or [1, 2, 4, 8])
@@ -0,0 +1,186 @@
+from typing import List, Optional, Tuple, Any, Dict, Counter as CounterType
+from collections import Counter
+from hashlib import sha256
+import json
+import os
+import pickle
+
+from tokenor import TokenBuffer
+from nodor.node import Node
+from nodor.arena import NodeArena
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+compiler_packages = ('tokenor', 'nodor', 'crawler', 'generator', 'ir', 'driver')
+# パッケージの外にあるパイプライン (どのパスをどの順に走らせるか) も出力を変える
+compiler_files = ('main.py',)
+
+
+def compiler_sources() -> List[str]:
+    paths = [os.path.join(root, name) for name in compiler_files]
+    for package in compiler_packages:
+        for directory, dirs, files in sorted(os.walk(os.path.join(root, package))):
+            dirs.sort()
+            paths.extend(os.path.join(directory, name) for name in sorted(files) if name.endswith('.py'))
+    return paths
+
+
+def compiler_version() -> str:
+    # コンパイラのソースが変われば別のキーになるように, ソースそのもののハッシュを版とする
+    h = sha256()
+    for path in compiler_sources():
+        h.update(os.path.relpath(path, root).encode())
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class Entry:
+    # 温かい再ビルドはアセンブリしか要らないので, トークン列と AST は読み出されるまで unpickle しない
+    asm: str
+    payload: Optional[bytes]
+    loaded: Optional[Tuple[Optional[TokenBuffer], Optional[List[Node]]]]
+
+    def __init__(self, tokens: Optional[TokenBuffer], nodes: Optional[List[Node]], asm: str) -> None:
+        self.asm = asm
+        self.payload = None
+        self.loaded = (tokens, nodes)
+
+    def load(self) -> Tuple[Optional[TokenBuffer], Optional[List[Node]]]:
+        if self.loaded is None:
+            tokens, arena, roots = pickle.loads(self.payload)  # type: ignore
+            self.loaded = tokens, None if arena is None else [arena.to_node(root) for root in roots]
+        return self.loaded
+
+    @property
+    def tokens(self) -> Optional[TokenBuffer]:
+        return self.load()[0]
+
+    @property
+    def nodes(self) -> Optional[List[Node]]:
+        return self.load()[1]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        payload = self.payload
+        if self.loaded is not None:
+            # AST は NodeArena の並列配列にして持つ. 木のまま pickle すると深い式で再帰が溢れる
+            tokens, nodes = self.loaded
+            arena: Optional[NodeArena] = None
+            roots: List[int] = []
+            if nodes is not None:
+                arena = NodeArena()
+                roots = arena.extend(nodes)
+            payload = pickle.dumps((tokens, arena, roots), protocol=pickle.HIGHEST_PROTOCOL)
+        return {'asm': self.asm, 'payload': payload}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.asm = state['asm']
+        self.payload = state['payload']
+        self.loaded = None
+
+
+class CompileCache:
+    # ソースのハッシュ + コンパイラの版 + オプションをキーに, トークン列・型付き AST・アセンブリを置いておく.
+    # 使うたびに mtime を更新し, max_bytes を超えたら mtime の古いものから max_bytes の 3/4 まで捨てる (LRU).
+    # 合計は書いた分を足して見積もり, 上限を超えたときだけディレクトリを数え直す
+    directory: str
+    max_bytes: int
+    version: str
+    stats: CounterType[str]
+    size: Optional[int]  # 見積もった合計. 他のプロセスが書いた分は数え直すまで入らない
+
+    def __init__(self, directory: str, max_bytes: int = 64 << 20, version: Optional[str] = None) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = compiler_version() if version is None else version
+        self.stats = Counter()
+        self.size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: bytes, options: Tuple[Any, ...]) -> str:
+        h = sha256()
+        h.update(self.version.encode())
+        h.update(repr(options).encode())
+        h.update(source)
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:] + '.pkl')
+
+    def get(self, key: str) -> Optional[Entry]:
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            # 読んだ後に他のプロセスが捨てていれば, ここで消えている
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.stats['miss'] += 1
+            return None
+        self.stats['hit'] += 1
+        return entry
+
+    def put(self, key: str, entry: Entry) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 書きかけを読まれないように別名で書いてから置き換える
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            written = f.tell()
+        os.replace(tmp, path)
+        self.stats['store'] += 1
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += written
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        found = []
+        for directory, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.pkl'):
+                    path = os.path.join(directory, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def evict(self) -> None:
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        low_water = self.max_bytes * 3 // 4
+        for _, size, path in entries:
+            if total <= low_water:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats['evict'] += 1
+        self.size = total
+
+    def stats_path(self) -> str:
+        return os.path.join(self.directory, 'stats.json')
+
+    def totals(self) -> Dict[str, int]:
+        try:
+            with open(self.stats_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_stats(self) -> Dict[str, int]:
+        # 実行ごとの数を足し込んで, 累計を返す
+        totals = Counter(self.totals())
+        totals.update(self.stats)
+        tmp = f'{self.stats_path()}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(dict(totals), f)
+        os.replace(tmp, self.stats_path())
+        self.stats.clear()
+        return dict(totals)
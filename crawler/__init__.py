@@ -1,4 +1,4 @@
-from typing import List, Union, Any, TypeVar, Generic
+from typing import List, Union, Any, TypeVar, Generic, Iterable, Iterator, Dict, Callable, Optional, Tuple
 from abc import ABCMeta, abstractmethod
 
 import nodor.node as node_type
@@ -6,35 +6,102 @@ from nodor.node import Node
 
 T = TypeVar('T')
 
+handler_names: Dict[type, str] = {
+    node_type.Integer: 'integer',
+    node_type.Variable: 'variable',
+    node_type.Assign: 'assign',
+    node_type.Add: 'add',
+    node_type.Mul: 'mul',
+}
+
 
 class CrawlError(Exception):
     pass
 
 
-class Crawler(Generic[T], metaclass=ABCMeta):
+def children(node: Node) -> Tuple[Node, ...]:
+    if isinstance(node, node_type.BinaryOperator):
+        return node.left, node.right
+    return ()
 
-    def crawl(self, nodes: List[Node]) -> None:
-        for node in nodes:
-            self.check(node)
 
-    def check(self, node: Node) -> T:
-        if isinstance(node, node_type.Integer):
-            return self.integer(node)
+def pre_order(root: Node) -> Iterator[Node]:
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children(node)))
 
-        if isinstance(node, node_type.Variable):
-            return self.variable(node)
 
-        if isinstance(node, node_type.Assign):
-            return self.assign(node)
+def post_order(root: Node) -> Iterator[Node]:
+    stack: List[Tuple[Node, bool]] = [(root, False)]
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            yield node
+            continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children(node)))
 
-        if isinstance(node, node_type.Add):
-            return self.add(node)
 
-        if isinstance(node, node_type.Mul):
-            return self.mul(node)
+class Crawler(Generic[T], metaclass=ABCMeta):
+    dispatch: Dict[type, Callable[[Any, Any], T]] = {}
+    # True にすると子を明示スタックで帰りがけ順に先に評価し, ハンドラ内の check は結果を返すだけになる
+    iterative: bool = False
+    # iterative で False にすると, 代入の左辺はハンドラに渡さない. 代入のハンドラが左辺を自分で扱うとき用
+    visit_assign_target: bool = True
+    _results: Optional[Dict[int, T]] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = {node_class: getattr(cls, name) for node_class, name in handler_names.items()}
+
+    def crawl(self, nodes: Iterable[Node]) -> None:
+        for node in nodes:
+            self.check(node)
 
+    def handler(self, node: Node) -> Callable[[Any, Any], T]:
+        try:
+            return self.dispatch[type(node)]
+        except KeyError:
+            pass
+        for node_class in type(node).__mro__:
+            if node_class in handler_names:
+                return getattr(type(self), handler_names[node_class])
         raise CrawlError(f'unknown node: {node}')
 
+    def check(self, node: Node) -> T:
+        results = self._results
+        if results is not None:
+            if id(node) in results:
+                return results[id(node)]
+        elif self.iterative and isinstance(node, node_type.BinaryOperator):
+            return self.check_iterative(node)
+        return self.handler(node)(self, node)
+
+    def check_iterative(self, root: Node) -> T:
+        # 行きがけ順 (右の子を先に積む) を逆に辿ると, 子が親より先・左が右より先になる
+        order: List[Node] = []
+        stack: List[Node] = [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            if isinstance(node, node_type.BinaryOperator):
+                if self.visit_assign_target or not isinstance(node, node_type.Assign):
+                    stack.append(node.left)
+                stack.append(node.right)
+
+        results: Dict[int, T] = {}
+        self._results = results
+        dispatch = self.dispatch
+        try:
+            for node in reversed(order):
+                handler = dispatch.get(type(node)) or self.handler(node)
+                results[id(node)] = handler(self, node)
+        finally:
+            self._results = None
+        return results[id(root)]
+
     @abstractmethod
     def integer(self, node: node_type.Integer) -> T:
         raise NotImplementedError
@@ -0,0 +1,211 @@
+from typing import List, Tuple, Iterable, Union, Optional, TextIO, Any, Counter as CounterType
+from argparse import Namespace
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from io import StringIO
+from itertools import repeat
+from time import perf_counter
+import os
+
+from tokenor import Tokenizer, TokenizeError, TokenStream, TokenSource, TokenBuffer, Source
+from tokenor.source import open_source, SourceMap
+from nodor import parse, parse_iter, ErrorReport
+from nodor.node import Node
+from nodor.optimizer import ConstantFolder
+from generator import CodeGenerator
+from generator.writer import AsmWriter
+from generator.register import RegisterCodeGenerator
+from generator.peephole import Peephole
+from ir.backend import IRCodeGenerator
+from ir.ssa import mem2reg
+from ir.dse import DeadStoreEliminator
+from ir.isel import fold_immediates
+from cache import CompileCache, Entry
+from assembler import Assembler, parse as parse_asm
+from assembler.elf import write_executable
+from engine import execute, exit_code
+
+# 出力を変えるオプション. キャッシュのキーに含める
+output_options = ('source_lines', 'release', 'optimize', 'stack_machine', 'ir')
+
+
+class CompileError(Exception):
+    line: int
+    col: int
+
+    def __init__(self, line: int, col: int, *args: str) -> None:
+        super().__init__(*args)
+        self.line = line
+        self.col = col
+
+    def __str__(self) -> str:
+        return f'{self.line} : {self.col} : {", ".join(self.args)}'
+
+
+def error(source_map: SourceMap, index: int, *args: str) -> CompileError:
+    line, col = source_map.location(index)
+    return CompileError(line, col, *args)
+
+
+def code_generator(args: Namespace, source_map: SourceMap, tokens: TokenSource, out: Optional[TextIO] = None,
+                   assembler: Optional[Assembler] = None,
+                   peephole: Optional[Peephole] = None) -> Union[CodeGenerator, IRCodeGenerator]:
+    # assembler があれば命令列をそのまま機械語にする. out はそのときデバッグ用のテキスト出力.
+    # peephole は -O のときに使う. 発火数を集めたいときは呼び出し側で作って渡す
+    if peephole is None:
+        peephole = Peephole()
+    writer = AsmWriter(out, annotate=not args.release, passes=[peephole] if args.optimize else [],
+                       sink=None if assembler is None else assembler.feed)
+    if args.ir:
+        return IRCodeGenerator(writer, [mem2reg, fold_immediates, DeadStoreEliminator()] if args.optimize else [])
+    generator = CodeGenerator if args.stack_machine else RegisterCodeGenerator
+    if args.source_lines:
+        return generator(source_map, tokens, writer)
+    return generator(writer=writer)
+
+
+def optimize(args: Namespace, nodes: Iterable[Node]) -> Iterable[Node]:
+    if not args.optimize:
+        return nodes
+    return map(ConstantFolder(wrap_to_type=args.ir).check, nodes)
+
+
+def cache_options(args: Namespace) -> Tuple[Any, ...]:
+    return tuple(getattr(args, name) for name in output_options)
+
+
+def front(code: Source, source_map: SourceMap) -> Tuple[TokenBuffer, List[Node]]:
+    # 字句解析と構文解析・型付け
+    try:
+        token = Tokenizer.tokenize(code)
+    except TokenizeError as e:
+        raise error(source_map, e.position, *e.args)
+    try:
+        return token, parse(token)
+    except ErrorReport as e:
+        raise error(source_map, e.code_index, *e.args)
+
+
+def run_source(code: Source, source_map: SourceMap, args: Namespace) -> int:
+    # アセンブリを経ずにこのプロセスで実行し, 終了コードを返す. 計算は --ir かどうかで選んだ generator に合わせる
+    _, nodes = front(code, source_map)
+    return exit_code(execute(optimize(args, nodes), wrap_to_type=args.ir))
+
+
+def compile_batch(code: Source, source_map: SourceMap, args: Namespace, out: Optional[TextIO],
+                  cache: Optional[CompileCache] = None, assembler: Optional[Assembler] = None,
+                  peephole: Optional[Peephole] = None) -> None:
+    key = ''
+    if cache is not None:
+        key = cache.key(code.encode() if isinstance(code, str) else bytes(code), cache_options(args))
+        entry = cache.get(key)
+        if entry is not None:
+            if out is not None:
+                out.write(entry.asm)
+            if assembler is not None:
+                assembler.feed(parse_asm(entry.asm))
+            return
+    token, node = front(code, source_map)
+    if cache is None:
+        code_generator(args, source_map, token, out, assembler, peephole).generate(optimize(args, node))
+        return
+    asm = StringIO()
+    nodes = list(optimize(args, node))
+    code_generator(args, source_map, token, asm, assembler, peephole).generate(nodes)
+    if out is not None:
+        out.write(asm.getvalue())
+    cache.put(key, Entry(token, nodes, asm.getvalue()))
+
+
+def compile_stream(code: Source, source_map: SourceMap, args: Namespace, out: Optional[TextIO],
+                   assembler: Optional[Assembler] = None, peephole: Optional[Peephole] = None) -> None:
+    tokens = TokenStream(Tokenizer.tokenize_iter(code))
+    try:
+        code_generator(args, source_map, tokens, out, assembler, peephole).generate(
+            optimize(args, parse_iter(tokens)))
+    except TokenizeError as e:
+        raise error(source_map, e.position, *e.args)
+    except ErrorReport as e:
+        raise error(source_map, e.code_index, *e.args)
+
+
+def open_cache(args: Namespace) -> Optional[CompileCache]:
+    if args.cache is None:
+        return None
+    return CompileCache(args.cache, args.cache_size << 20, getattr(args, 'cache_version', None))
+
+
+@dataclass
+class Result:
+    source: str
+    output: Optional[str]
+    error: Optional[str]
+    seconds: float
+    peephole: CounterType[str] = field(default_factory=Counter)
+    cache: CounterType[str] = field(default_factory=Counter)
+
+
+def output_path(source: str) -> str:
+    return os.path.splitext(source)[0] + '.s'
+
+
+def executable_path(source: str) -> str:
+    return os.path.splitext(source)[0]
+
+
+def link(assembler: Assembler, path: str) -> None:
+    write_executable(path, assembler.link(), assembler.entry)
+
+
+def sources(paths: Iterable[str]) -> List[str]:
+    # ディレクトリは中の .c を再帰的に集める
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for directory, dirs, files in os.walk(path):
+            dirs.sort()
+            found.extend(os.path.join(directory, name) for name in sorted(files) if name.endswith('.c'))
+    return found
+
+
+def compile_file(source: str, args: Namespace) -> Result:
+    # 1 ファイル分. ソースの誤りと読み書きの失敗は例外を投げず, 診断を Result に入れて返す.
+    # それ以外 (generator やアセンブラの例外) はコンパイラの不具合なのでそのまま投げる
+    start = perf_counter()
+    peephole = Peephole()
+    cache = open_cache(args)
+    # --elf なら .s の代わりに実行ファイルを書く. --keep-asm で .s も残す
+    assembler = Assembler() if args.elf else None
+    output: Optional[str] = output_path(source) if assembler is None else executable_path(source)
+    message = None
+    try:
+        out = StringIO() if assembler is None or args.keep_asm else None
+        with open_source(source) as code:
+            source_map = SourceMap(code)
+            if args.stream:
+                compile_stream(code, source_map, args, out, assembler, peephole)
+            else:
+                compile_batch(code, source_map, args, out, cache, assembler, peephole)
+        if assembler is not None:
+            link(assembler, output)  # type: ignore
+        if out is not None:
+            with open(output_path(source), 'w') as f:
+                f.write(out.getvalue())
+    except CompileError as e:
+        output, message = None, str(e)
+    except OSError as e:
+        output, message = None, f'{type(e).__name__}: {e}'
+    return Result(source, output, message, perf_counter() - start, peephole.stats,
+                  Counter() if cache is None else cache.stats)
+
+
+def compile_files(files: List[str], args: Namespace, jobs: Optional[int] = None) -> List[Result]:
+    # 入力の順に結果を返す. jobs が 1 ならこのプロセスで順に処理する
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(files) <= 1:
+        return [compile_file(f, args) for f in files]
+    with ProcessPoolExecutor(jobs) as pool:
+        return list(pool.map(compile_file, files, repeat(args), chunksize=max(1, len(files) // (jobs * 4))))
@@ -0,0 +1,156 @@
+from typing import List, Dict, Tuple, Iterable, Optional, Callable, Set
+from dataclasses import dataclass
+
+import nodor.node as node_type
+from nodor.node import Node
+from nodor.type import Int
+from nodor.variable_validator.scope import Scope
+from nodor.optimizer import has_side_effect
+from crawler import Crawler
+
+frame_size = 26 * 8  # prologue が積む変数の領域
+
+
+def initial_frame() -> bytes:
+    # prologue と同じく 0 ~ 25 を順に push した後のスタック. [rbp - 8(i + 1), rbp - 8i) に i が入る
+    frame = bytearray(frame_size)
+    for i in range(frame_size // 8):
+        frame[frame_size - 8 * (i + 1):frame_size - 8 * i] = i.to_bytes(8, 'little')
+    return bytes(frame)
+
+
+def variable_bytes(var: node_type.Variable) -> slice:
+    start = frame_size - var.offset  # type: ignore
+    return slice(start, start + var.type.size // 8)  # type: ignore
+
+
+def initial_values() -> List[int]:
+    # シンボル ID ごとの変数の初期値. 変数は [rbp - offset] からの型の幅のバイト列
+    frame = initial_frame()
+    return [int.from_bytes(frame[variable_bytes(var)], 'little') for var in Scope().symbols]
+
+
+def to_frame(values: List[int]) -> bytes:
+    # 実行後の変数をスタックの像に書き戻す. 実際のバイナリのメモリと比べるとき用
+    frame = bytearray(initial_frame())
+    for var, value in zip(Scope().symbols, values):
+        size = var.type.size // 8  # type: ignore
+        frame[variable_bytes(var)] = value.to_bytes(size, 'little')
+    return bytes(frame)
+
+
+initial_rax = frame_size // 8 - 1  # 文が無ければ prologue で最後に積んだ値が rax に残る
+
+
+def exit_code(rax: int) -> int:
+    return rax & 0xff
+
+
+mask64 = 0xffffffffffffffff
+
+
+def mask(node: Node) -> int:
+    if not isinstance(node.type, Int):
+        raise ValueError(f'untyped node: {node}')
+    return (1 << node.type.size) - 1
+
+
+Function = Callable[[List[int]], int]
+
+
+@dataclass
+class Program:
+    source: str  # 生成した Python のソース
+    function: Function
+
+    def run(self, values: Optional[List[int]] = None) -> Tuple[int, List[int]]:
+        # (rax, 実行後の変数)
+        memory = initial_values() if values is None else list(values)
+        return self.function(memory), memory
+
+
+class Compiler(Crawler[str]):
+    # 型付き AST を 1 本の直線的な Python 関数にする. 一時値はローカル変数で, 値はレジスタに入るビット列.
+    # AST の generator と同じく + * は 64bit で計算して代入でだけ切り詰める. wrap_to_type なら IR と同じく
+    # ノードごとに Int.wrap する. 変数は v<シンボル ID> というローカルに読み込み, 最後にまとめて書き戻す
+    iterative = True
+
+    wrap_to_type: bool
+    lines: List[str]
+    temps: int
+    loaded: Set[int]
+    stored: Set[int]
+    snapshot: bool  # 文が代入を含むなら, 読んだ値は後の代入で変わらないよう一時値に写す
+
+    def __init__(self, wrap_to_type: bool = False) -> None:
+        self.wrap_to_type = wrap_to_type
+        self.lines = []
+        self.temps = 0
+        self.loaded = set()
+        self.stored = set()
+        self.snapshot = False
+
+    def compile(self, nodes: Iterable[Node]) -> Program:
+        for node in nodes:
+            self.snapshot = has_side_effect(node)
+            self.lines.append(f'rax = {self.check(node)}')
+        body = [f'v{s} = m[{s}]' for s in sorted(self.loaded)] + [f'rax = {initial_rax}'] + self.lines \
+            + [f'm[{s}] = v{s}' for s in sorted(self.stored)] + ['return rax']
+        source = 'def program(m):\n' + ''.join(f'    {line}\n' for line in body)
+        namespace: Dict[str, Function] = {}
+        exec(compile(source, '<engine>', 'exec'), namespace)
+        return Program(source, namespace['program'])
+
+    def temp(self, expression: str) -> str:
+        name = f't{self.temps}'
+        self.temps += 1
+        self.lines.append(f'{name} = {expression}')
+        return name
+
+    def mask(self, node: Node) -> int:
+        return mask(node) if self.wrap_to_type else mask64
+
+    def symbol(self, node: node_type.Variable) -> int:
+        if node.symbol is None:
+            raise ValueError(f'variable is not validated: {node}')
+        return node.symbol
+
+    def integer(self, node: node_type.Integer) -> str:
+        return str(node.value & self.mask(node))
+
+    def variable(self, node: node_type.Variable) -> str:
+        symbol = self.symbol(node)
+        self.loaded.add(symbol)
+        return self.temp(f'v{symbol}') if self.snapshot else f'v{symbol}'
+
+    def assign(self, node: node_type.Assign) -> str:
+        if not isinstance(node.left, node_type.Variable):
+            raise ValueError(f'left of assign is not variable: {node}')
+        symbol = self.symbol(node.left)
+        value = self.check(node.right)
+        # 代入先より狭い値はゼロ拡張されているので切り詰めなくてよい
+        if self.mask(node.right) > mask(node.left):
+            value = f'{value} & {mask(node.left)}'
+        self.stored.add(symbol)
+        name = f't{self.temps}'
+        self.temps += 1
+        self.lines.append(f'{name} = v{symbol} = {value}')
+        return name
+
+    def add(self, node: node_type.Add) -> str:
+        left = self.check(node.left)
+        return self.temp(f'({left} + {self.check(node.right)}) & {self.mask(node)}')
+
+    def mul(self, node: node_type.Mul) -> str:
+        left = self.check(node.left)
+        return self.temp(f'({left} * {self.check(node.right)}) & {self.mask(node)}')
+
+
+def compile_program(nodes: Iterable[Node], wrap_to_type: bool = False) -> Program:
+    return Compiler(wrap_to_type).compile(nodes)
+
+
+def execute(nodes: Iterable[Node], wrap_to_type: bool = False) -> int:
+    # rax を返す. 終了コードは exit_code(rax)
+    rax, _ = compile_program(nodes, wrap_to_type).run()
+    return rax
@@ -0,0 +1,134 @@
+from typing import List, Dict, Tuple, Iterable, Union, Any, TYPE_CHECKING
+
+import nodor.node as node_type
+from nodor.node import Node
+from nodor.type import Int
+from nodor.variable_validator.scope import Scope
+from crawler import Crawler
+from . import initial_values, initial_rax
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    try:
+        import numpy as np
+    except ImportError:  # numpy が無ければ batch 評価だけ使えない
+        np = None
+
+Array = Any  # np.ndarray
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise ImportError('batch evaluation needs numpy')
+
+
+def int_type(node: Union[Node, node_type.BinaryOperator]) -> Int:
+    if not isinstance(node.type, Int):
+        raise ValueError(f'untyped node: {node}')
+    return node.type
+
+
+def dtype(ty: Int) -> Any:
+    return np.dtype(f'{"" if ty.signed else "u"}int{ty.size}')
+
+
+def unsigned(ty: Int) -> Any:
+    return np.dtype(f'uint{ty.size}')
+
+
+def convert(array: Array, source: Int, target: Int) -> Array:
+    # 値は型の幅のビット列をゼロ拡張したものなので, 広げるときは符号無しにしてから広げる
+    if source.size == target.size:
+        return array.view(dtype(target))
+    if source.size < target.size:
+        return array.view(unsigned(source)).astype(dtype(target))
+    return array.astype(dtype(target))
+
+
+uint64 = Int(64, False, True, None, None)
+
+
+def initial_batch(rows: int) -> Array:
+    # 各行が aa ~ zz (シンボル ID 順) の初期値を符号無し 64bit で持つ
+    require_numpy()
+    return np.tile(np.array(initial_values(), dtype=np.uint64), (rows, 1))
+
+
+def random_batch(rows: int, seed: int = 0) -> Array:
+    # 変数ごとに型の幅に収まる乱数を初期値にする
+    require_numpy()
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 1 << 64, size=(rows, len(initial_values())), dtype=np.uint64)
+    for var in Scope().symbols:
+        values[:, var.symbol] &= np.uint64((1 << var.type.size) - 1)  # type: ignore
+    return values
+
+
+class BatchEvaluator(Crawler[Array]):
+    # 型付き AST を行ごとに独立な配列演算として評価する. 1 行が 1 回の実行で, 変数は列.
+    # 演算はノードの型の dtype で行い, numpy の配列演算の wrap がそのまま Int.wrap になる (--ir と同じ計算)
+    iterative = True
+
+    values: Array
+    columns: Dict[int, Tuple[Array, Int]]
+
+    def __init__(self, values: Array) -> None:
+        require_numpy()
+        self.values = values
+        self.columns = {}
+
+    def evaluate(self, nodes: Iterable[Node]) -> Tuple[Array, Array]:
+        # (行ごとの rax, 実行後の変数). どちらも符号無し 64bit
+        rows = len(self.values)
+        rax = np.full(rows, initial_rax, dtype=np.uint64)
+        for node in nodes:
+            rax = np.broadcast_to(convert(self.check(node), int_type(node), uint64), (rows,))
+        memory = self.values.copy()
+        for symbol, (column, ty) in self.columns.items():
+            memory[:, symbol] = convert(column, ty, uint64)
+        return rax.copy(), memory
+
+    def load(self, node: node_type.Variable) -> Tuple[Array, Int]:
+        if node.symbol is None:
+            raise ValueError(f'variable is not validated: {node}')
+        if node.symbol not in self.columns:
+            ty = int_type(node)
+            column = self.values[:, node.symbol]
+            self.columns[node.symbol] = column.astype(unsigned(ty)).view(dtype(ty)), ty
+        return self.columns[node.symbol]
+
+    def integer(self, node: node_type.Integer) -> Array:
+        # 1 要素の配列にしておくと, 定数どうしの演算もスカラーにならず wrap する
+        ty = int_type(node)
+        return np.array([node.value & ((1 << ty.size) - 1)], dtype=unsigned(ty)).view(dtype(ty))
+
+    def variable(self, node: node_type.Variable) -> Array:
+        column, _ = self.load(node)
+        return column
+
+    def assign(self, node: node_type.Assign) -> Array:
+        if not isinstance(node.left, node_type.Variable):
+            raise ValueError(f'left of assign is not variable: {node}')
+        ty = int_type(node.left)
+        # 狭い値はゼロ拡張, 広い値は切り詰めて代入先の型にする. 代入式の値も代入先の型
+        value = convert(self.check(node.right), int_type(node.right), ty)
+        self.columns[node.left.symbol] = value, ty  # type: ignore
+        return value
+
+    def operands(self, node: node_type.BinaryOperator) -> Tuple[Array, Array]:
+        ty = int_type(node)
+        return convert(self.check(node.left), int_type(node.left), ty), \
+            convert(self.check(node.right), int_type(node.right), ty)
+
+    def add(self, node: node_type.Add) -> Array:
+        left, right = self.operands(node)
+        return left + right
+
+    def mul(self, node: node_type.Mul) -> Array:
+        left, right = self.operands(node)
+        return left * right
+
+
+def run_batch(nodes: List[Node], values: Array) -> Tuple[Array, Array]:
+    return BatchEvaluator(values).evaluate(nodes)
@@ -1,35 +1,65 @@
-from typing import List, Callable, TypeVar, Generator, Any
-from contextlib import contextmanager
-from sys import stdout
+from typing import List, Callable, TypeVar, Any, Iterable, Iterator, Optional
 
 import nodor.node as node_type
 from nodor.node import Node
 from crawler import Crawler
+from tokenor import TokenSource
+from tokenor.source import SourceMap
+from .writer import AsmWriter, Text
 
 T = TypeVar('T')
 
 
-@contextmanager
-def indent() -> Generator[None, None, None]:
-    orig_write = stdout.write
-
-    def new_write(s: str) -> None:
-        orig_write('    ' + s)
-
-    stdout.write = new_write  # type: ignore  # Cannot assign to a method
-    yield
-    stdout.write = orig_write  # type: ignore  # Cannot assign to a method
+# 子を持つノードのハンドラは子のコード生成を yield で頼むジェネレータを返す. 葉のハンドラはその場で書いて None.
+# CodeGenerator.run がジェネレータを明示スタックで回す
+Steps = Optional[Iterator[Node]]
 
 
 def label(fn: Callable[..., T]) -> Callable[..., T]:
-    def wrap(*args: Any, **kwargs: Any) -> T:
-        print(f'; < {fn.__qualname__.split(".")[-1]} >')
-        with indent():
-            ret = fn(*args, *kwargs)
-        return ret
+    name = fn.__name__
+
+    def wrap(self: 'CodeGenerator', *args: Any, **kwargs: Any) -> T:
+        if not self.writer.annotate:
+            return fn(self, *args, **kwargs)
+        self.writer.comment(f'< {name} >')
+        with self.writer.indent():
+            result = fn(self, *args, **kwargs)
+        # ジェネレータは後で回されるので, その間も字下げしておく
+        return result if result is None else indented(self.writer, result)  # type: ignore
     return wrap
 
 
+def indented(writer: AsmWriter, steps: Iterator[Node]) -> Iterator[Node]:
+    with writer.indent():
+        yield from steps
+
+
+def prologue(writer: AsmWriter) -> None:
+    # 変数 aa ~ zz はスタックに 0 ~ 25 を積んで作る
+    writer.emit('section .text')
+    writer.emit('global _start')
+    writer.emit('_start:')
+    with writer.indent():
+        writer.ins('call', 'main')
+        writer.ins('mov', 'rdi', 'rax')
+        writer.ins('mov', 'rax', '60')
+        writer.ins('syscall')
+    writer.emit('main:')
+    with writer.indent():
+        writer.ins('push', 'rsp')
+        writer.ins('mov', 'rbp', 'rsp')
+        for i in range(26):
+            writer.ins('mov', 'rax', str(i))
+            writer.ins('push', 'rax')
+
+
+def epilogue(writer: AsmWriter) -> None:
+    with writer.indent():
+        writer.ins('leave')
+        writer.ins('ret')
+    writer.flush()
+
+
 class GenerateError(ValueError):
     node: Node
 
@@ -38,85 +68,97 @@ class GenerateError(ValueError):
         self.node = node
 
 
-class CodeGenerator(Crawler[None]):
-
-    def generate(self, nodes: List[Node]) -> None:
-        print('section .text')
-        print('global _start')
-        print('_start:')
-        with indent():
-            print('call main')
-            print('mov rdi, rax')
-            print('mov rax, 60')
-            print('syscall')
-        print('main:')
-        with indent():
-            print('push rsp')
-            print('mov rbp, rsp')
-            for i in range(26):
-                print(f'mov rax, {i}')
-                print('push rax')
+class CodeGenerator(Crawler[Steps]):
+    source_map: Optional[SourceMap]
+    tokens: Optional[TokenSource]
+    writer: AsmWriter
+
+    def __init__(self, source_map: Optional[SourceMap] = None, tokens: Optional[TokenSource] = None,
+                 writer: Optional[AsmWriter] = None) -> None:
+        self.source_map = source_map
+        self.tokens = tokens
+        self.writer = AsmWriter() if writer is None else writer
+
+    def generate(self, nodes: Iterable[Node]) -> None:
+        prologue(self.writer)
+        with self.writer.indent():
             self.crawl(nodes)
-            print('leave')
-            print('ret')
+        epilogue(self.writer)
+
+    def crawl(self, nodes: Iterable[Node]) -> None:
+        if self.source_map is None or self.tokens is None:
+            for node in nodes:
+                self.run(node)
+            return
+        for node in nodes:
+            line, _ = self.source_map.location(self.tokens.position_at(node.position))
+            self.writer.push(Text(f'; {line}: {self.source_map.line_text(line).strip()}', self.writer.level, False))
+            self.run(node)
+
+    def run(self, root: Node) -> None:
+        # 再帰しないので, 深く入れ子になった式でも Python のスタックは溢れない
+        steps = self.check(root)
+        stack: List[Iterator[Node]] = [] if steps is None else [steps]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+            steps = self.check(child)
+            if steps is not None:
+                stack.append(steps)
 
     @label
     def gen_addr(self, node: node_type.Variable) -> None:
-        print(f'lea rax, [rbp - {node.offset}]')
+        self.writer.ins('lea', 'rax', f'[rbp - {node.offset}]')
         return
 
-    def gen(self, node: Node) -> None:
-        return self.check(node)
-
     @label
-    def integer(self, node: node_type.Integer) -> None:
-        print(f'mov rax, {node.value & 0xffffffffffffffff}')
-        return
+    def integer(self, node: node_type.Integer) -> Steps:
+        self.writer.ins('mov', 'rax', f'{node.value & 0xffffffffffffffff}')
+        return None
 
     @label
-    def variable(self, node: node_type.Variable) -> None:
+    def variable(self, node: node_type.Variable) -> Steps:
         if node.type is None:
             raise GenerateError(node, 'type is None')
         self.gen_addr(node)
-        print('mov rdi, rax')
-        print('xor eax, eax')
-        print(f'mov {node.type.ax()}, [rdi]')
-        return
+        self.writer.ins('mov', 'rdi', 'rax')
+        self.writer.ins('xor', 'eax', 'eax')
+        self.writer.ins('mov', node.type.ax(), '[rdi]')
+        return None
 
     @label
-    def assign(self, node: node_type.Assign) -> None:
+    def assign(self, node: node_type.Assign) -> Iterator[Node]:
         if node.type is None:
             raise GenerateError(node, 'type is None')
         if node.left.type is None:
             raise GenerateError(node.left, 'type is None')
         if node.right.type is None:
             raise GenerateError(node.right, 'type is None')
-        self.gen(node.right)
-        print('push rax')
+        yield node.right
+        self.writer.ins('push', 'rax')
         self.gen_addr(node.left)
-        print('pop rdi')
-        print(f'mov [rax], {node.left.type.di()}')
-        print('xor eax, eax')
-        print(f'mov {node.left.type.ax()}, {node.left.type.di()}')
-        return
+        self.writer.ins('pop', 'rdi')
+        self.writer.ins('mov', '[rax]', node.left.type.di())
+        self.writer.ins('xor', 'eax', 'eax')
+        self.writer.ins('mov', node.left.type.ax(), node.left.type.di())
 
     @label
-    def add(self, node: node_type.Add) -> None:
-        self.gen(node.left)
-        print('push rax')
-        self.gen(node.right)
-        print('mov rdi, rax')
-        print('pop rax')
-        print('add rax, rdi')
-        return
+    def add(self, node: node_type.Add) -> Iterator[Node]:
+        yield node.left
+        self.writer.ins('push', 'rax')
+        yield node.right
+        self.writer.ins('mov', 'rdi', 'rax')
+        self.writer.ins('pop', 'rax')
+        self.writer.ins('add', 'rax', 'rdi')
 
     @label
-    def mul(self, node: node_type.Mul) -> None:
-        self.gen(node.left)
-        print('push rax')
-        self.gen(node.right)
-        print('mov rdi, rax')
-        print('pop rax')
-        print('mov edx, 0')
-        print('mul rdi')
-        return
+    def mul(self, node: node_type.Mul) -> Iterator[Node]:
+        yield node.left
+        self.writer.ins('push', 'rax')
+        yield node.right
+        self.writer.ins('mov', 'rdi', 'rax')
+        self.writer.ins('pop', 'rax')
+        self.writer.ins('mov', 'edx', '0')
+        self.writer.ins('mul', 'rdi')
@@ -0,0 +1,234 @@
+from typing import Iterator, List, Dict, Tuple, Optional, FrozenSet, Callable, Counter as CounterType
+from collections import Counter
+from itertools import islice
+import re
+
+from .writer import Instruction, Text, Item
+from .register import register_names
+
+# 名前 -> (物理レジスタ, 幅)
+registers: Dict[str, Tuple[str, int]] = {name: (base, size)
+                                         for base, names in register_names.items()
+                                         for size, name in names.items()}
+registers.update({'rbp': ('rbp', 64), 'rsp': ('rsp', 64), 'rbx': ('rbx', 64)})
+
+FLAGS = 'flags'
+everything: FrozenSet[str] = frozenset({*(base for base, _ in registers.values()), FLAGS})
+live_at_return: FrozenSet[str] = frozenset({'rax', 'rsp', 'rbp', 'rbx'})
+word_re = re.compile(r'[a-z0-9]+')
+
+Effect = Tuple[FrozenSet[str], FrozenSet[str]]  # (読むもの, 丸ごと書き換えるもの)
+
+
+def register(operand: str) -> Optional[Tuple[str, int]]:
+    return registers.get(operand)
+
+
+def is_memory(operand: str) -> bool:
+    return '[' in operand
+
+
+def address(operand: str) -> str:
+    # 'dword [rbp - 4]' -> '[rbp - 4]'
+    return operand[operand.index('['):]
+
+
+def reads_of(operand: str) -> FrozenSet[str]:
+    return frozenset(registers[w][0] for w in word_re.findall(operand) if w in registers)
+
+
+def write(operand: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    # 書き込み先が読むもの, 丸ごと書き換えるもの. 32bit 以上への書き込みは上位も消す
+    r = register(operand)
+    if r is None:
+        return reads_of(operand), frozenset()
+    if r[1] >= 32:
+        return frozenset(), frozenset({r[0]})
+    return frozenset({r[0]}), frozenset()
+
+
+def effect(ins: Instruction) -> Optional[Effect]:
+    # None は分からない命令. peephole はこれを越えない
+    op, operands = ins.op, ins.operands
+    if op in ('mov', 'movzx', 'lea') and len(operands) == 2:
+        reads, writes = write(operands[0])
+        return reads | reads_of(operands[1]), writes
+    if op == 'xor' and len(operands) == 2 and operands[0] == operands[1]:
+        _, writes = write(operands[0])
+        return frozenset(), writes | {FLAGS}
+    if op in ('add', 'sub', 'imul', 'and', 'or', 'xor') and len(operands) == 2:
+        reads, writes = write(operands[0])
+        return reads | reads_of(operands[0]) | reads_of(operands[1]), writes | {FLAGS}
+    if op == 'mul' and len(operands) == 1:
+        return frozenset({'rax'}) | reads_of(operands[0]), frozenset({'rax', 'rdx', FLAGS})
+    if op == 'push' and len(operands) == 1:
+        return frozenset({'rsp'}) | reads_of(operands[0]), frozenset()
+    if op == 'pop' and len(operands) == 1:
+        reads, writes = write(operands[0])
+        return reads | {'rsp'}, writes
+    if op == 'leave':
+        return frozenset({'rbp'}), frozenset({'rsp', 'rbp'})
+    if op == 'ret':
+        # 戻った先で使うもの以外はすべて死んでいる
+        return live_at_return, everything - live_at_return
+    return None
+
+
+def is_register64(operand: str) -> bool:
+    r = register(operand)
+    return r is not None and r[1] == 64
+
+
+Rule = Callable[['Peephole', List[Optional[Item]], int], bool]
+
+
+class Peephole:
+    # 命令列を小さな窓で眺めて書き換える. コメントは素通しし, ラベルなどは越えない
+    stats: CounterType[str]
+    window: int = 16  # push と pop の間に置ける命令数
+    horizon: int = 64  # 生存を調べる先読みの命令数
+
+    def __init__(self) -> None:
+        self.stats = Counter()
+
+    def __call__(self, items: List[Item]) -> List[Item]:
+        work: List[Optional[Item]] = list(items)
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(work)):
+                if not isinstance(work[i], Instruction):
+                    continue
+                for rule in self.rules:
+                    if rule(self, work, i):
+                        self.stats[rule.__name__] += 1
+                        changed = True
+                        break
+            work = [i for i in work if i is not None]
+        return work  # type: ignore
+
+    @staticmethod
+    def following(items: List[Optional[Item]], i: int) -> Iterator[int]:
+        # i の後ろに続く命令の添字. バリアで止まる
+        for j in range(i + 1, len(items)):
+            item = items[j]
+            if item is None:
+                continue
+            if isinstance(item, Text):
+                if item.barrier:
+                    return
+                continue
+            yield j
+
+    def next(self, items: List[Optional[Item]], i: int) -> Optional[int]:
+        return next(self.following(items, i), None)
+
+    def dead(self, items: List[Optional[Item]], i: int, name: str) -> bool:
+        # i より後で name が読まれる前に丸ごと書き換えられるか
+        for j in islice(self.following(items, i), self.horizon):
+            e = effect(items[j])  # type: ignore
+            if e is None or name in e[0]:
+                return False
+            if name in e[1]:
+                return True
+        return False
+
+    def self_move(self, items: List[Optional[Item]], i: int) -> bool:
+        # mov rax, rax (32bit は上位を消すので残す)
+        ins: Instruction = items[i]  # type: ignore
+        if ins.op != 'mov' or ins.operands[0] != ins.operands[1] or not is_register64(ins.operands[0]):
+            return False
+        items[i] = None
+        return True
+
+    def dead_move(self, items: List[Optional[Item]], i: int) -> bool:
+        # 読まれないうちに上書きされる mov / lea / movzx / xor r, r を消す
+        ins: Instruction = items[i]  # type: ignore
+        if ins.op not in ('mov', 'movzx', 'lea', 'xor'):
+            return False
+        e = effect(ins)
+        if e is None or len(e[1] - {FLAGS}) != 1:
+            return False
+        if not all(self.dead(items, i, name) for name in e[1]):
+            return False
+        items[i] = None
+        return True
+
+    def push_pop(self, items: List[Optional[Item]], i: int) -> bool:
+        # push X ... pop Y を mov にする. 間で rsp を触らず, X か Y のどちらかが保たれていること
+        ins: Instruction = items[i]  # type: ignore
+        if ins.op != 'push' or not is_register64(ins.operands[0]):
+            return False
+        x = register(ins.operands[0])[0]  # type: ignore
+        x_kept = True
+        between: List[Effect] = []  # push と pop の間の命令の効果
+        for j in islice(self.following(items, i), self.window):
+            other: Instruction = items[j]  # type: ignore
+            if other.op == 'pop':
+                if not is_register64(other.operands[0]):
+                    return False
+                y = register(other.operands[0])[0]  # type: ignore
+                y_free = not any(y in reads or y in writes for reads, writes in between)
+                if x == y and not between:
+                    items[i] = items[j] = None
+                elif x_kept:
+                    items[i] = None
+                    items[j] = Instruction('mov', (other.operands[0], ins.operands[0]), other.level)
+                elif y_free:
+                    items[i] = Instruction('mov', (other.operands[0], ins.operands[0]), ins.level)
+                    items[j] = None
+                else:
+                    return False
+                return True
+            e = effect(other)
+            if e is None or 'rsp' in e[0] or 'rsp' in e[1]:
+                return False
+            if x in e[1] or (other.operands and register(other.operands[0]) is not None
+                             and register(other.operands[0])[0] == x):  # type: ignore
+                x_kept = False
+            between.append(e)
+        return False
+
+    def copy_forward(self, items: List[Optional[Item]], i: int) -> bool:
+        # lea A, M; mov B, A で A がその後死んでいれば lea B, M
+        ins: Instruction = items[i]  # type: ignore
+        if ins.op not in ('mov', 'lea') or not is_register64(ins.operands[0]):
+            return False
+        j = self.next(items, i)
+        if j is None:
+            return False
+        other: Instruction = items[j]  # type: ignore
+        if other.op != 'mov' or other.operands[1] != ins.operands[0] or not is_register64(other.operands[0]):
+            return False
+        if not self.dead(items, j, register(ins.operands[0])[0]):  # type: ignore
+            return False
+        items[i] = Instruction(ins.op, (other.operands[0], ins.operands[1]), ins.level)
+        items[j] = None
+        return True
+
+    def address_fold(self, items: List[Optional[Item]], i: int) -> bool:
+        # lea B, [M]; mov R, [B] で B がその後死んでいれば mov R, [M]
+        ins: Instruction = items[i]  # type: ignore
+        if ins.op != 'lea' or not is_register64(ins.operands[0]):
+            return False
+        j = self.next(items, i)
+        if j is None:
+            return False
+        other: Instruction = items[j]  # type: ignore
+        if other.op not in ('mov', 'movzx'):
+            return False
+        b = ins.operands[0]
+        target = f'[{b}]'
+        operands = tuple(o.replace(target, ins.operands[1]) if is_memory(o) and address(o) == target else o
+                         for o in other.operands)
+        folded = Instruction(other.op, operands, other.level)
+        e = effect(folded)
+        if operands == other.operands or e is None or b in e[0]:
+            return False
+        if b not in e[1] and not self.dead(items, j, b):
+            return False
+        items[i] = None
+        items[j] = folded
+        return True
+
+    rules: List[Rule] = [self_move, dead_move, push_pop, copy_forward, address_fold]
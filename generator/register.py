@@ -0,0 +1,130 @@
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional
+
+import nodor.node as node_type
+from nodor.node import Node
+from crawler import post_order
+from tokenor import TokenSource
+from tokenor.source import SourceMap
+from . import CodeGenerator, GenerateError, Steps, label
+from .writer import AsmWriter
+
+register_names: Dict[str, Dict[int, str]] = {
+    'rax': {64: 'rax', 32: 'eax', 16: 'ax', 8: 'al'},
+    'rdi': {64: 'rdi', 32: 'edi', 16: 'di', 8: 'dil'},
+    'rsi': {64: 'rsi', 32: 'esi', 16: 'si', 8: 'sil'},
+    'rdx': {64: 'rdx', 32: 'edx', 16: 'dx', 8: 'dl'},
+    'rcx': {64: 'rcx', 32: 'ecx', 16: 'cx', 8: 'cl'},
+    'r8': {64: 'r8', 32: 'r8d', 16: 'r8w', 8: 'r8b'},
+    'r9': {64: 'r9', 32: 'r9d', 16: 'r9w', 8: 'r9b'},
+    'r10': {64: 'r10', 32: 'r10d', 16: 'r10w', 8: 'r10b'},
+    'r11': {64: 'r11', 32: 'r11d', 16: 'r11w', 8: 'r11b'},
+}
+
+memory_size = {64: 'qword', 32: 'dword', 16: 'word', 8: 'byte'}
+
+
+def reg(name: str, size: int) -> str:
+    return register_names[name][size]
+
+
+class RegisterCodeGenerator(CodeGenerator):
+    # Sethi-Ullman 番号で必要なレジスタ数を数え, 呼び出し元保存レジスタに式の一時値を割り当てる.
+    # 足りないときだけスタックに退避する
+    registers: List[str] = ['rax', 'rdi', 'rsi', 'rdx', 'rcx', 'r8', 'r9', 'r10']
+    scratch: str = 'r11'
+
+    regs: List[str]
+    needs: Dict[int, Tuple[int, bool]]  # id(node) -> (必要なレジスタ数, 代入を含むか)
+
+    def __init__(self, source_map: Optional[SourceMap] = None, tokens: Optional[TokenSource] = None,
+                 writer: Optional[AsmWriter] = None, registers: Optional[List[str]] = None) -> None:
+        super().__init__(source_map, tokens, writer)
+        if registers is not None:
+            self.registers = registers
+        self.regs = self.registers
+        self.needs = {}
+
+    def crawl(self, nodes: Iterable[Node]) -> None:
+        super().crawl(self.numbered(nodes))
+
+    def numbered(self, nodes: Iterable[Node]) -> Iterator[Node]:
+        for node in nodes:
+            self.needs.clear()
+            for n in post_order(node):
+                self.needs[id(n)] = self.number(n)
+            yield node
+
+    def number(self, node: Node) -> Tuple[int, bool]:
+        if isinstance(node, node_type.Assign):
+            return self.needs[id(node.right)][0], True
+        if isinstance(node, node_type.BinaryOperator):
+            left, left_effect = self.needs[id(node.left)]
+            right, right_effect = self.needs[id(node.right)]
+            need = left + 1 if left == right else max(left, right)
+            return need, left_effect or right_effect
+        return 1, False
+
+    @label
+    def integer(self, node: node_type.Integer) -> Steps:
+        self.writer.ins('mov', self.regs[0], f'{node.value & 0xffffffffffffffff}')
+        return None
+
+    @label
+    def variable(self, node: node_type.Variable) -> Steps:
+        if node.type is None or node.type.size is None:
+            raise GenerateError(node, 'type is None')
+        size = node.type.size
+        if size >= 32:
+            self.writer.ins('mov', reg(self.regs[0], size), f'[rbp - {node.offset}]')
+        else:
+            self.writer.ins('movzx', reg(self.regs[0], 32), f'{memory_size[size]} [rbp - {node.offset}]')
+        return None
+
+    @label
+    def assign(self, node: node_type.Assign) -> Iterator[Node]:
+        if not isinstance(node.left, node_type.Variable):
+            raise GenerateError(node.left, 'left of assign is not variable')
+        if node.left.type is None or node.left.type.size is None:
+            raise GenerateError(node.left, 'type is None')
+        size = node.left.type.size
+        r = self.regs[0]
+        yield node.right
+        self.writer.ins('mov', f'[rbp - {node.left.offset}]', reg(r, size))
+        if size == 32:
+            self.writer.ins('mov', reg(r, 32), reg(r, 32))
+        elif size < 32:
+            self.writer.ins('movzx', reg(r, 32), reg(r, size))
+
+    @label
+    def add(self, node: node_type.Add) -> Iterator[Node]:
+        return self.binary(node, 'add')
+
+    @label
+    def mul(self, node: node_type.Mul) -> Iterator[Node]:
+        return self.binary(node, 'imul')
+
+    def binary(self, node: node_type.BinaryOperator, op: str) -> Iterator[Node]:
+        # yield した子は self.regs を使う. 子は終わるまでに self.regs を元に戻す
+        regs = self.regs
+        if len(regs) == 1:
+            # レジスタが尽きたので左辺を退避する
+            yield node.left
+            self.writer.ins('push', regs[0])
+            yield node.right
+            self.writer.ins('mov', self.scratch, regs[0])
+            self.writer.ins('pop', regs[0])
+            self.writer.ins(op, regs[0], self.scratch)
+            return
+
+        left, left_effect = self.needs[id(node.left)]
+        right, right_effect = self.needs[id(node.right)]
+        # 代入を含む式は評価順を変えない. add / imul は可換なので結果はどちらの順でも regs[0] に入る
+        if right > left and not left_effect and not right_effect:
+            first, second = node.right, node.left
+        else:
+            first, second = node.left, node.right
+        yield first
+        self.regs = regs[1:]
+        yield second
+        self.regs = regs
+        self.writer.ins(op, regs[0], regs[1])
@@ -0,0 +1,91 @@
+from typing import List, Optional, TextIO, Iterator, Tuple, Union, Callable
+from dataclasses import dataclass
+from contextlib import contextmanager
+import sys
+
+
+@dataclass
+class Instruction:
+    op: str
+    operands: Tuple[str, ...] = ()
+    level: int = 0
+
+    def __str__(self) -> str:
+        if not self.operands:
+            return self.op
+        return f'{self.op} {", ".join(self.operands)}'
+
+
+@dataclass
+class Text:
+    # ラベル・ディレクティブ・コメント. barrier なものを peephole は越えない
+    text: str
+    level: int = 0
+    barrier: bool = True
+
+
+Item = Union[Instruction, Text]
+Pass = Callable[[List[Item]], List[Item]]
+Sink = Callable[[List[Item]], None]
+
+
+class AsmWriter:
+    # 出力は命令のリストとしてためておき, chunk_size 個ごとに passes を通してまとめて書く.
+    # sink があれば同じ命令列を渡す (組み込みのアセンブラ). そのときは file を指定した場合だけテキストも書く
+    file: Optional[TextIO]
+    annotate: bool
+    chunk_size: int
+    items: List[Item]
+    level: int
+    passes: List[Pass]
+    sink: Optional[Sink]
+    keep: int = 8  # chunk の境目をまたぐパターンのために末尾を次に回す数
+    max_level: int = 64  # 深く入れ子になった式で字下げが出力を 2 乗で膨らませないよう打ち切る
+
+    def __init__(self, file: Optional[TextIO] = None, annotate: bool = True, chunk_size: int = 4096,
+                 passes: Optional[List[Pass]] = None, sink: Optional[Sink] = None) -> None:
+        self.file = sys.stdout if file is None and sink is None else file
+        self.annotate = annotate
+        self.chunk_size = chunk_size
+        self.items = []
+        self.level = 0
+        self.passes = [] if passes is None else passes
+        self.sink = sink
+
+    def ins(self, op: str, *operands: str) -> None:
+        self.push(Instruction(op, operands, self.level))
+
+    def emit(self, line: str) -> None:
+        self.push(Text(line, self.level))
+
+    def comment(self, text: str) -> None:
+        if self.annotate:
+            self.push(Text('; ' + text, self.level, False))
+
+    def push(self, item: Item) -> None:
+        self.items.append(item)
+        if len(self.items) >= self.chunk_size:
+            self.flush(final=False)
+
+    @contextmanager
+    def indent(self) -> Iterator[None]:
+        self.level += 1
+        try:
+            yield
+        finally:
+            self.level -= 1
+
+    def flush(self, final: bool = True) -> None:
+        items = self.items
+        for p in self.passes:
+            items = p(items)
+        rest: List[Item] = []
+        if not final and self.passes:
+            items, rest = items[:-self.keep], items[-self.keep:]
+        if items and self.sink is not None:
+            self.sink(items)
+        if items and self.file is not None:
+            m = self.max_level
+            self.file.write(''.join(f'{"    " * min(i.level, m)}{i}\n' if isinstance(i, Instruction)
+                                    else f'{"    " * min(i.level, m)}{i.text}\n' for i in items))
+        self.items = rest
@@ -0,0 +1,118 @@
+from typing import List, Optional, Tuple, Union, Dict, Iterator, Set, Callable
+from dataclasses import dataclass, field
+from enum import Enum
+
+
+class Op(Enum):
+    CONST = 'const'
+    LOAD = 'load'
+    STORE = 'store'
+    ZEXT = 'zext'
+    COPY = 'copy'
+    ADD = 'add'
+    MUL = 'mul'
+    RET = 'ret'
+
+
+commutative: Set[Op] = {Op.ADD, Op.MUL}
+binary_ops: Set[Op] = {Op.ADD, Op.MUL}
+
+
+class IRError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class VReg:
+    id: int
+
+    def __str__(self) -> str:
+        return f'%{self.id}'
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+Operand = Union[VReg, int]  # int は即値
+
+
+@dataclass(frozen=True)
+class Slot:
+    # 変数のスタック上の置き場所
+    symbol: int
+    name: str
+    offset: int
+    size: int
+
+    def __str__(self) -> str:
+        return f'{self.name}.{self.size}'
+
+
+@dataclass
+class Instr:
+    op: Op
+    dest: Optional[VReg] = None
+    args: Tuple[Operand, ...] = ()
+    slot: Optional[Slot] = None
+    size: int = 64
+
+    def uses(self) -> Iterator[VReg]:
+        return (a for a in self.args if isinstance(a, VReg))
+
+    def __str__(self) -> str:
+        operands = [str(self.slot)] if self.slot is not None else []
+        operands += [str(a) for a in self.args]
+        if self.op == Op.ZEXT:
+            operands.append(str(self.size))
+        text = f'{self.op.value} {", ".join(operands)}'.rstrip()
+        return text if self.dest is None else f'{self.dest} = {text}'
+
+
+@dataclass
+class Block:
+    label: str
+    instrs: List[Instr] = field(default_factory=list)
+    successors: List['Block'] = field(default_factory=list)
+    predecessors: List['Block'] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return '\n'.join([f'{self.label}:', *(f'    {i}' for i in self.instrs)])
+
+
+@dataclass
+class Function:
+    name: str
+    blocks: List[Block] = field(default_factory=list)
+    slots: Dict[int, Slot] = field(default_factory=dict)
+    vregs: int = 0
+
+    def new_vreg(self) -> VReg:
+        self.vregs += 1
+        return VReg(self.vregs - 1)
+
+    def new_block(self, label: str) -> Block:
+        block = Block(label)
+        self.blocks.append(block)
+        return block
+
+    def instrs(self) -> Iterator[Instr]:
+        for block in self.blocks:
+            yield from block.instrs
+
+    def verify(self) -> None:
+        # 仮想レジスタは一度だけ定義され, 使う前に定義されていること (ブロックは並び順 = 支配順)
+        defined: Set[VReg] = set()
+        for ins in self.instrs():
+            for v in ins.uses():
+                if v not in defined:
+                    raise IRError(f'{v} is used before definition: {ins}')
+            if ins.dest is not None:
+                if ins.dest in defined:
+                    raise IRError(f'{ins.dest} is defined twice: {ins}')
+                defined.add(ins.dest)
+
+    def __str__(self) -> str:
+        return '\n'.join([f'{self.name}:', *(str(b) for b in self.blocks)])
+
+
+Pass = Callable[[Function], Function]
@@ -0,0 +1,219 @@
+from typing import List, Dict, Optional, Iterable, Sequence
+from dataclasses import dataclass
+
+from nodor.node import Node
+from generator import prologue, epilogue
+from generator.writer import AsmWriter
+from generator.register import RegisterCodeGenerator, reg, memory_size
+from . import Function, Instr, Op, VReg, Operand, IRError, Pass, binary_ops
+from .isel import Location, select_binary, operand, is_register, cost
+from .lower import Lowerer
+
+frame_size = 26 * 8  # prologue が積む変数の領域. 退避場所はこの下に取る
+
+
+@dataclass
+class Interval:
+    vreg: VReg
+    start: int
+    end: int
+    register: Optional[str] = None
+    spill: Optional[int] = None  # 退避場所の番号
+
+
+def intervals(function: Function) -> List[Interval]:
+    # ループが無いので, 命令の並び順で定義から最後の使用までを生存区間にすればよい
+    found: Dict[VReg, Interval] = {}
+    for i, ins in enumerate(function.instrs()):
+        for v in ins.uses():
+            found[v].end = i
+        if ins.dest is not None:
+            found[ins.dest] = Interval(ins.dest, i, i)
+    return list(found.values())
+
+
+def linear_scan(function: Function, registers: List[str]) -> Dict[VReg, Interval]:
+    # Poletto & Sarkar の linear scan. 足りなければ一番遠くまで生きる区間を退避する
+    instrs = list(function.instrs())
+    free = list(reversed(registers))
+    spill_ends: List[int] = []  # 退避場所ごとに, 最後に置いた区間の終わり
+    active: List[Interval] = []
+    allocation: Dict[VReg, Interval] = {}
+
+    for interval in sorted(intervals(function), key=lambda i: i.start):
+        # この命令で最後に使われる値のレジスタは, この命令の結果に回してよい
+        for done in [a for a in active if a.end <= interval.start]:
+            active.remove(done)
+            free.append(done.register)  # type: ignore
+        allocation[interval.vreg] = interval
+
+        hint = next(instrs[interval.start].uses(), None)
+        hinted = allocation[hint].register if hint is not None else None
+        if hinted is not None and hinted in free:
+            free.remove(hinted)
+            interval.register = hinted
+        elif free:
+            interval.register = free.pop()
+        else:
+            victim = max(active, key=lambda a: a.end)
+            if victim.end > interval.end:
+                interval.register, victim.register = victim.register, None
+                active.remove(victim)
+                active.append(interval)
+            else:
+                victim = interval
+            # 退避は区間全体に効くので, 区間の始まりより前に空いた場所だけを使い回す
+            victim.spill = next((k for k, end in enumerate(spill_ends) if end <= victim.start), len(spill_ends))
+            if victim.spill == len(spill_ends):
+                spill_ends.append(victim.end)
+            else:
+                spill_ends[victim.spill] = victim.end
+            continue
+        active.append(interval)
+    return allocation
+
+
+def result(ins: Instr) -> VReg:
+    if ins.dest is None:
+        raise IRError(f'instruction has no result: {ins}')
+    return ins.dest
+
+
+def constant(ins: Instr) -> int:
+    value = ins.args[0]
+    if not isinstance(value, int):
+        raise IRError(f'const of non-immediate: {ins}')
+    return value
+
+
+def slot_address(ins: Instr) -> str:
+    if ins.slot is None:
+        raise IRError(f'memory access without slot: {ins}')
+    return f'[rbp - {ins.slot.offset}]'
+
+
+class Backend:
+    # IR を nasm に落とす. 一時値は linear scan でレジスタに割り当て, 溢れたものはスタックに置く
+    registers: List[str] = RegisterCodeGenerator.registers
+    scratch: str = RegisterCodeGenerator.scratch
+
+    writer: AsmWriter
+    allocation: Dict[VReg, Interval]
+    cost: int  # 選んだ演算の命令列の重さの合計 (isel.costs)
+
+    def __init__(self, writer: Optional[AsmWriter] = None, registers: Optional[List[str]] = None) -> None:
+        self.writer = AsmWriter() if writer is None else writer
+        if registers is not None:
+            self.registers = registers
+        self.allocation = {}
+        self.cost = 0
+
+    def generate(self, function: Function) -> None:
+        self.allocation = linear_scan(function, self.registers)
+        spills = max((i.spill + 1 for i in self.allocation.values() if i.spill is not None), default=0)
+        prologue(self.writer)
+        with self.writer.indent():
+            if spills:
+                self.writer.ins('sub', 'rsp', str(spills * 8))
+            for block in function.blocks:
+                self.writer.emit(f'.{block.label}:')
+                for ins in block.instrs:
+                    self.writer.comment(str(ins))
+                    self.instruction(ins)
+        epilogue(self.writer)
+
+    def place(self, v: VReg) -> str:
+        # 仮想レジスタの置き場所. 割り当てたレジスタか '[rbp - n]' の退避場所
+        interval = self.allocation[v]
+        if interval.register is not None:
+            return interval.register
+        if interval.spill is None:
+            raise IRError(f'{v} is neither in a register nor spilled')
+        return f'[rbp - {frame_size + (interval.spill + 1) * 8}]'
+
+    def location(self, v: Operand) -> Location:
+        return v if isinstance(v, int) else self.place(v)
+
+    def target(self, v: VReg) -> str:
+        loc = self.place(v)
+        return loc if is_register(loc) else self.scratch
+
+    def write_back(self, v: VReg, r: str) -> None:
+        loc = self.place(v)
+        if loc != r:
+            self.writer.ins('mov', loc, r)
+
+    def instruction(self, ins: Instr) -> None:
+        op = ins.op
+        if op == Op.CONST:
+            dest = result(ins)
+            r = self.target(dest)
+            value = constant(ins)
+            # 32bit に収まる値は 32bit の mov で上位を 0 にできる
+            self.writer.ins('mov', reg(r, 32 if value < 1 << 32 else 64), str(value))
+            self.write_back(dest, r)
+        elif op == Op.LOAD:
+            dest = result(ins)
+            r = self.target(dest)
+            address = slot_address(ins)
+            if ins.size >= 32:
+                self.writer.ins('mov', reg(r, ins.size), address)
+            else:
+                self.writer.ins('movzx', reg(r, 32), f'{memory_size[ins.size]} {address}')
+            self.write_back(dest, r)
+        elif op == Op.STORE:
+            source = self.location(ins.args[0])
+            address = slot_address(ins)
+            if isinstance(source, int):
+                self.writer.ins('mov', f'{memory_size[ins.size]} {address}', operand(source, ins.size))
+                return
+            if not is_register(source):
+                self.writer.ins('mov', self.scratch, source)
+                source = self.scratch
+            self.writer.ins('mov', address, reg(source, ins.size))
+        elif op == Op.ZEXT:
+            dest = result(ins)
+            r = self.target(dest)
+            self.writer.ins('mov' if ins.size == 32 else 'movzx', reg(r, 32),
+                            operand(self.location(ins.args[0]), ins.size))
+            self.write_back(dest, r)
+        elif op == Op.COPY:
+            dest = result(ins)
+            r = self.target(dest)
+            if self.location(ins.args[0]) != r:
+                self.writer.ins('mov', r, operand(self.location(ins.args[0]), 64))
+            self.write_back(dest, r)
+        elif op in binary_ops:
+            dest = result(ins)
+            r = self.target(dest)
+            a, b = (self.location(v) for v in ins.args)
+            sequence = select_binary(op, r, a, b, ins.size)
+            self.cost += cost(sequence)
+            for op_name, *operands in sequence:
+                self.writer.ins(op_name, *operands)
+            self.write_back(dest, r)
+        elif op == Op.RET:
+            if ins.args and self.location(ins.args[0]) != 'rax':
+                self.writer.ins('mov', 'rax', operand(self.location(ins.args[0]), 64))
+        else:
+            raise IRError(f'unknown instruction: {ins}')
+
+
+class IRCodeGenerator:
+    # CodeGenerator と同じく generate(nodes) で使える. passes は下ろした IR に順に掛ける
+    backend: Backend
+    passes: List[Pass]
+
+    def __init__(self, writer: Optional[AsmWriter] = None, passes: Sequence[Pass] = (),
+                 registers: Optional[List[str]] = None) -> None:
+        self.backend = Backend(writer, registers)
+        self.passes = list(passes)
+
+    def lower(self, nodes: Iterable[Node]) -> Function:
+        function = Lowerer().lower(nodes)
+        for p in self.passes:
+            function = p(function)
+        return function
+
+    def generate(self, nodes: Iterable[Node]) -> None:
+        self.backend.generate(self.lower(nodes))
@@ -0,0 +1,42 @@
+from typing import List, Counter as CounterType, Set, Optional
+from collections import Counter
+
+from . import Function, Instr, Op
+from .liveness import Liveness, Value, pure_ops
+
+
+class DeadStoreEliminator:
+    # 読まれる前に上書きされるストアと, 結果を誰も使わない計算を消す.
+    # 関数の出口では変数がすべて生きているので各変数の最後のストアと ret の値は残る
+    stats: CounterType[str]
+
+    def __init__(self) -> None:
+        self.stats = Counter()
+
+    def __call__(self, function: Function) -> Function:
+        changed = True
+        while changed:
+            changed = False
+            liveness = Liveness(function)
+            for block in function.blocks:
+                live = set(liveness.live_out[block.label])
+                kept: List[Instr] = []
+                for ins in reversed(block.instrs):
+                    reason = self.dead(ins, live)
+                    if reason is not None:
+                        self.stats[reason] += 1
+                        changed = True
+                        continue
+                    Liveness.transfer(ins, live)
+                    kept.append(ins)
+                kept.reverse()
+                block.instrs = kept
+        return function
+
+    @staticmethod
+    def dead(ins: Instr, live: Set[Value]) -> Optional[str]:
+        if ins.op == Op.STORE and ins.slot not in live:
+            return 'dead_store'
+        if ins.op in pure_ops and ins.dest is not None and ins.dest not in live:
+            return 'dead_value'
+        return None
@@ -0,0 +1,138 @@
+from typing import List, Dict, Tuple, Union, Iterator, TypeGuard
+
+from generator.register import reg, memory_size
+from . import Function, Op, VReg, commutative, binary_ops
+
+# 命令ごとのおおよその重さ. 候補の命令列はこの合計が一番小さいものを選ぶ
+costs: Dict[str, int] = {
+    'mov': 1,
+    'movzx': 1,
+    'xor': 1,
+    'add': 1,
+    'shl': 1,
+    'lea': 1,
+    'imul': 3,
+}
+memory_cost = 4  # メモリ上の被演算子 (lea のアドレス計算は除く)
+slow_lea_cost = 1  # base + index + disp や base の無い index*scale の lea
+
+Location = Union[str, int]  # 64bit のレジスタ名, '[rbp - n]' の退避場所, または即値
+Sequence = List[Tuple[str, ...]]
+
+
+def op_width(size: int) -> int:
+    # 32bit 以下は 32bit 命令で計算する. 32bit 命令は上位 32bit を 0 にするので Int.wrap と合う
+    return 64 if size > 32 else 32
+
+
+def encodable(value: int, size: int) -> bool:
+    # 即値は 32bit. 64bit 命令では符号拡張されるので, その範囲のビット列だけ
+    if op_width(size) == 32:
+        return True
+    value &= 0xffffffffffffffff
+    return value < 1 << 31 or value >= (1 << 64) - (1 << 31)
+
+
+def immediate(value: int, width: int) -> str:
+    value &= (1 << width) - 1
+    return str(value - (1 << width) if value >> (width - 1) else value)
+
+
+def operand(loc: Location, width: int) -> str:
+    if isinstance(loc, int):
+        return immediate(loc, width)
+    if loc.startswith('['):
+        return f'{memory_size[width]} {loc}'
+    return reg(loc, width)
+
+
+def is_register(loc: Location) -> TypeGuard[str]:
+    return isinstance(loc, str) and not loc.startswith('[')
+
+
+def cost(sequence: Sequence) -> int:
+    total = 0
+    for op, *operands in sequence:
+        total += costs[op]
+        if op == 'lea':
+            address = operands[1]
+            if ('*' in address and '+' not in address) or address.count('+') >= 2:
+                total += slow_lea_cost
+        elif any('[' in o for o in operands):
+            total += memory_cost
+    return total
+
+
+def select(candidates: Iterator[Sequence]) -> Sequence:
+    return min(candidates, key=cost)
+
+
+def into(r: str, a: Location, width: int) -> Sequence:
+    return [] if a == r else [('mov', reg(r, width), operand(a, width))]
+
+
+def add_candidates(r: str, a: Location, b: Location, size: int) -> Iterator[Sequence]:
+    width = op_width(size)
+    if b == r or isinstance(a, int):
+        a, b = b, a
+    if b == 0:
+        yield into(r, a, width)
+        return
+    if is_register(a) and (is_register(b) or isinstance(b, int)) and a != r:
+        yield [('lea', reg(r, width), f'[{a} + {b if is_register(b) else immediate(b, 32)}]')]  # type: ignore
+    yield into(r, a, width) + [('add', reg(r, width), operand(b, width))]
+
+
+def mul_candidates(r: str, a: Location, b: Location, size: int) -> Iterator[Sequence]:
+    width = op_width(size)
+    if b == r or isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        k = b & ((1 << width) - 1)
+        if k == 0:
+            yield [('xor', reg(r, 32), reg(r, 32))]
+            return
+        if k == 1:
+            yield into(r, a, width)
+            return
+        if k & (k - 1) == 0:
+            yield into(r, a, width) + [('shl', reg(r, width), str(k.bit_length() - 1))]
+            if is_register(a) and k == 2:
+                yield [('lea', reg(r, width), f'[{a} + {a}]')]
+            elif is_register(a) and k in (4, 8):
+                yield [('lea', reg(r, width), f'[{a}*{k}]')]
+        if is_register(a) and k in (3, 5, 9):
+            yield [('lea', reg(r, width), f'[{a} + {a}*{k - 1}]')]
+        if not isinstance(a, int):
+            yield [('imul', reg(r, width), operand(a, width), immediate(k, width))]
+        return
+    yield into(r, a, width) + [('imul', reg(r, width), operand(b, width))]
+
+
+def select_binary(op: Op, r: str, a: Location, b: Location, size: int) -> Sequence:
+    sequence = select(add_candidates(r, a, b, size) if op == Op.ADD else mul_candidates(r, a, b, size))
+    if size < 32:
+        sequence = sequence + [('movzx', reg(r, 32), reg(r, size))]
+    return sequence
+
+
+def fold_immediates(function: Function) -> Function:
+    # 定数を使う側に即値として埋め込む. 両方定数なら畳む. 使われなくなった const は DSE が消す
+    constants: Dict[VReg, int] = {}
+    for ins in function.instrs():
+        args = [constants.get(a, a) if isinstance(a, VReg) else a for a in ins.args]
+        if ins.op == Op.CONST and ins.dest is not None:
+            constants[ins.dest] = ins.args[0]  # type: ignore
+        elif ins.op in binary_ops and all(isinstance(a, int) for a in args):
+            value = args[0] + args[1] if ins.op == Op.ADD else args[0] * args[1]  # type: ignore
+            ins.op, ins.args = Op.CONST, (value & ((1 << ins.size) - 1),)
+            constants[ins.dest] = ins.args[0]  # type: ignore
+        elif ins.op in binary_ops:
+            pairs = [a if not isinstance(a, int) or encodable(a, ins.size) else original
+                     for a, original in zip(args, ins.args)]
+            if isinstance(pairs[0], int) and ins.op in commutative:
+                pairs.reverse()
+            ins.args = tuple(pairs)
+        elif ins.op == Op.STORE and isinstance(args[0], int) and encodable(args[0], ins.size):
+            ins.args = (args[0] & ((1 << ins.size) - 1),)
+    return function
@@ -0,0 +1,70 @@
+from typing import Dict, Set, Union, Iterator, Tuple, FrozenSet, Optional
+
+from . import Function, Block, Instr, Op, VReg, Slot
+
+Value = Union[VReg, Slot]  # 生きているかを調べる対象. 変数は Slot で表す
+
+pure_ops = {Op.CONST, Op.LOAD, Op.ZEXT, Op.COPY, Op.ADD, Op.MUL}
+
+
+def uses(ins: Instr) -> Iterator[Value]:
+    yield from ins.uses()
+    if ins.op == Op.LOAD and ins.slot is not None:
+        yield ins.slot
+
+
+def defs(ins: Instr) -> Iterator[Value]:
+    if ins.dest is not None:
+        yield ins.dest
+    if ins.op == Op.STORE and ins.slot is not None and ins.size == ins.slot.size:
+        # 幅の足りない書き込みは変数を丸ごと書き換えないので殺さない
+        yield ins.slot
+
+
+class Liveness:
+    # ブロック単位の後ろ向きデータフロー解析. 関数の出口ではすべての変数が生きている (最後の値が見える)
+    function: Function
+    live_in: Dict[str, Set[Value]]
+    live_out: Dict[str, Set[Value]]
+
+    def __init__(self, function: Function) -> None:
+        self.function = function
+        self.live_in = {b.label: set() for b in function.blocks}
+        self.live_out = {b.label: set() for b in function.blocks}
+        self.solve()
+
+    def exit_live(self) -> FrozenSet[Value]:
+        return frozenset(self.function.slots.values())
+
+    def solve(self) -> None:
+        changed = True
+        while changed:
+            changed = False
+            for block in reversed(self.function.blocks):
+                out: Set[Value] = set(self.exit_live()) if not block.successors else set()
+                for succ in block.successors:
+                    out |= self.live_in[succ.label]
+                live = self.transfer_block(block, out)
+                if out != self.live_out[block.label] or live != self.live_in[block.label]:
+                    self.live_out[block.label] = out
+                    self.live_in[block.label] = live
+                    changed = True
+
+    def transfer_block(self, block: Block, out: Set[Value]) -> Set[Value]:
+        live = set(out)
+        for ins in reversed(block.instrs):
+            self.transfer(ins, live)
+        return live
+
+    @staticmethod
+    def transfer(ins: Instr, live: Set[Value]) -> None:
+        for d in defs(ins):
+            live.discard(d)
+        live.update(uses(ins))
+
+    def backward(self, block: Block, out: Optional[Set[Value]] = None) -> Iterator[Tuple[Instr, Set[Value]]]:
+        # 後ろから (命令, その直後に生きているもの) を返す. 集合は使い回すので写しが要るなら呼び出し側で取る
+        live = set(self.live_out[block.label] if out is None else out)
+        for ins in reversed(block.instrs):
+            yield ins, live
+            self.transfer(ins, live)
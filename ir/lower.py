@@ -0,0 +1,81 @@
+from typing import Iterable, Optional
+
+import nodor.node as node_type
+from nodor.node import Node
+from crawler import Crawler
+from . import Function, Block, Instr, Op, VReg, Slot, Operand
+
+
+class LowerError(ValueError):
+    node: Node
+
+    def __init__(self, node: Node, *args: str):
+        super().__init__(*args)
+        self.node = node
+
+
+class Lowerer(Crawler[VReg]):
+    # 型付きの文の列を三番地コードに落とす. 値は 64bit の仮想レジスタに型の幅で wrap したビット列を
+    # ゼロ拡張して入れる (Int.wrap と同じ約束). なので代入先より狭い値は zext しなくてよい.
+    # 代入先は読まないので, 左辺の変数に load を出さないよう iterative でも辿らせない
+    iterative = True
+    visit_assign_target = False
+
+    function: Function
+    block: Block
+
+    def __init__(self, name: str = 'main') -> None:
+        self.function = Function(name)
+        self.block = self.function.new_block('entry')
+
+    def lower(self, nodes: Iterable[Node]) -> Function:
+        value: Optional[VReg] = None
+        for node in nodes:
+            value = self.check(node)
+        self.emit(Op.RET, () if value is None else (value,), dest=False)
+        return self.function
+
+    def emit(self, op: Op, args: tuple = (), slot: Optional[Slot] = None, size: int = 64,
+             dest: bool = True) -> VReg:
+        v = self.function.new_vreg() if dest else None
+        self.block.instrs.append(Instr(op, v, args, slot, size))
+        return v  # type: ignore
+
+    def slot(self, node: node_type.Variable) -> Slot:
+        if node.type is None or node.type.size is None or node.offset is None or node.symbol is None:
+            raise LowerError(node, 'variable is not validated')
+        slot = self.function.slots.get(node.symbol)
+        if slot is None:
+            slot = self.function.slots[node.symbol] = Slot(node.symbol, node.name, node.offset, node.type.size)
+        return slot
+
+    @staticmethod
+    def size(node: Node) -> int:
+        if node.type is None or node.type.size is None:
+            raise LowerError(node, 'type is None')
+        return node.type.size
+
+    def integer(self, node: node_type.Integer) -> VReg:
+        return self.emit(Op.CONST, (node.value & 0xffffffffffffffff,), size=self.size(node))
+
+    def variable(self, node: node_type.Variable) -> VReg:
+        slot = self.slot(node)
+        return self.emit(Op.LOAD, slot=slot, size=slot.size)
+
+    def assign(self, node: node_type.Assign) -> VReg:
+        if not isinstance(node.left, node_type.Variable):
+            raise LowerError(node.left, 'left of assign is not variable')
+        slot = self.slot(node.left)
+        value = self.check(node.right)
+        if self.size(node.right) > slot.size:
+            value = self.emit(Op.ZEXT, (value,), size=slot.size)
+        self.emit(Op.STORE, (value,), slot, slot.size, dest=False)
+        return value
+
+    def add(self, node: node_type.Add) -> VReg:
+        left: Operand = self.check(node.left)
+        return self.emit(Op.ADD, (left, self.check(node.right)), size=self.size(node))
+
+    def mul(self, node: node_type.Mul) -> VReg:
+        left: Operand = self.check(node.left)
+        return self.emit(Op.MUL, (left, self.check(node.right)), size=self.size(node))
@@ -0,0 +1,37 @@
+from typing import Dict
+
+from . import Function, Instr, Op, VReg, Operand
+
+
+def mem2reg(function: Function) -> Function:
+    # 変数の読み出しを, 直前に書いた値 (SSA の値) に置き換える. ストアは残す.
+    # 合流点には phi を置かないので, 先行ブロックが一つのときだけ値を引き継ぐ
+    replace: Dict[VReg, Operand] = {}
+    width: Dict[VReg, int] = {}  # 上位ビットが 0 と分かっている値の幅
+    values: Dict[str, Dict[int, Operand]] = {}
+
+    for block in function.blocks:
+        current: Dict[int, Operand] = dict(values[block.predecessors[0].label]) \
+            if len(block.predecessors) == 1 else {}
+        instrs = []
+        for ins in block.instrs:
+            ins.args = tuple(replace.get(a, a) if isinstance(a, VReg) else a for a in ins.args)
+            if ins.op == Op.LOAD and ins.slot is not None and ins.dest is not None:
+                slot, dest = ins.slot, ins.dest
+                known = current.get(slot.symbol)
+                if isinstance(known, int):
+                    ins = Instr(Op.CONST, dest, (known & ((1 << slot.size) - 1),))
+                elif known is not None and width.get(known, 64) <= slot.size:
+                    replace[dest] = known
+                    continue
+                elif known is not None:
+                    ins = Instr(Op.ZEXT, dest, (known,), size=slot.size)
+                current[slot.symbol] = dest
+            elif ins.op == Op.STORE and ins.slot is not None:
+                current[ins.slot.symbol] = ins.args[0]
+            if ins.dest is not None and ins.op != Op.COPY:
+                width[ins.dest] = ins.size
+            instrs.append(ins)
+        block.instrs = instrs
+        values[block.label] = current
+    return function
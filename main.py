@@ -1,48 +1,130 @@
-from sys import argv, stderr
-from typing import List, Tuple
+from sys import argv, stderr, stdout
+from typing import NoReturn, Optional, TextIO
+from argparse import ArgumentParser, Namespace
 
-from tokenor import Tokenizer, TokenizeError
-from nodor import parse, ErrorReport
-from nodor import variable_validator
-from nodor.variable_validator.scope import NotExist
-from nodor import typor
-from generator import CodeGenerator, GenerateError
+from tokenor.source import open_source, SourceMap
+from generator.peephole import Peephole
+from cache import CompileCache, compiler_version
+from assembler import Assembler, AssembleError
+from driver import CompileError, compile_batch, compile_stream, compile_files, open_cache, sources, link, run_source
 
 
-def code_index_to_row_col(code: str, index: int) -> Tuple[int, int]:
-    raw: int = 1
-    col: int = 1
+def report(e: CompileError) -> NoReturn:
+    stderr.write(str(e))
+    exit(1)
 
-    for i in range(index):
-        c = code[i]
-        if c == '\n':
-            raw += 1
-            col = 0
-        else:
-            col += 1
 
-    return raw, col
+def compile_many(args: Namespace, cache: Optional[CompileCache], peephole: Peephole) -> int:
+    # 引数のファイル・ディレクトリをプロセスに振り分け, それぞれの隣に .s を書く. 失敗した数を返す
+    results = compile_files(sources(args.sources), args, args.jobs)
+    failed = 0
+    for result in results:
+        peephole.stats.update(result.peephole)
+        if cache is not None:
+            cache.stats.update(result.cache)
+        if result.error is not None:
+            failed += 1
+            stderr.write(f'{result.source} : {result.error}\n')
+    if failed:
+        stderr.write(f'{failed} of {len(results)} files failed\n')
+    return failed
+
+
+def print_stats(args: Namespace, cache: Optional[CompileCache], peephole: Peephole) -> None:
+    if args.peephole_stats:
+        for rule, fired in peephole.stats.most_common():
+            stderr.write(f'{rule} : {fired}\n')
+    if cache is not None:
+        totals = cache.save_stats()
+        if args.cache_stats:
+            stderr.write(f'cache : {", ".join(f"{k} {v}" for k, v in sorted(totals.items()))}\n')
 
 
 if __name__ == '__main__':
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument('--stream', action='store_true',
+                            help='validate, type and emit one statement at a time')
+    arg_parser.add_argument('--source-lines', action='store_true',
+                            help='annotate each statement in the output with its source line')
+    arg_parser.add_argument('--release', action='store_true',
+                            help='omit the per-node "; < ... >" comments')
+    arg_parser.add_argument('-O', '--optimize', action='store_true',
+                            help='fold constants, simplify the typed AST and run the peephole pass over the output')
+    arg_parser.add_argument('--stack-machine', action='store_true',
+                            help='keep every temporary on the stack instead of allocating registers')
+    arg_parser.add_argument('--ir', action='store_true',
+                            help='lower to the three-address IR and allocate registers by linear scan '
+                                 '(-O also promotes variables to SSA values, folds immediates and removes dead stores). '
+                                 'Lowers the whole program at once, so it cannot be combined with '
+                                 '--stream, --source-lines or --stack-machine')
+    arg_parser.add_argument('--peephole-stats', action='store_true',
+                            help='print how many times each peephole rule fired to stderr (with -O)')
+    arg_parser.add_argument('--cache', nargs='?', const='.cache', default=None, metavar='DIR',
+                            help='reuse tokens, AST and assembly of unchanged sources (batch mode only)')
+    arg_parser.add_argument('--cache-size', type=int, default=64, metavar='MB',
+                            help='evict least recently used cache entries above this size')
+    arg_parser.add_argument('--cache-stats', action='store_true',
+                            help='print cumulative cache hit / miss counts to stderr')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help='worker processes when compiling several sources (default: CPU count)')
+    arg_parser.add_argument('--elf', action='store_true',
+                            help='encode the instructions in-process and write a static ELF64 executable '
+                                 'instead of nasm text (no nasm / ld needed)')
+    arg_parser.add_argument('-o', '--output', default='a.out', metavar='PATH',
+                            help='executable written by --elf when compiling main.c')
+    arg_parser.add_argument('--keep-asm', action='store_true',
+                            help='with --elf, also write the nasm text next to the executable for debugging')
+    arg_parser.add_argument('--run', action='store_true',
+                            help='execute main.c in-process without generating assembly and exit with its exit code')
+    arg_parser.add_argument('sources', nargs='*',
+                            help='C files or directories; each is compiled to a .s next to it. '
+                                 'Without any, main.c is compiled to stdout')
+    args = arg_parser.parse_args()
+    if args.ir:
+        conflicts = [flag for flag, on in (('--stream', args.stream), ('--source-lines', args.source_lines),
+                                           ('--stack-machine', args.stack_machine)) if on]
+        if conflicts:
+            arg_parser.error(f'--ir cannot be combined with {", ".join(conflicts)}')
+    peephole = Peephole()
+    if args.cache is not None:
+        args.cache_version = compiler_version()
+    cache = open_cache(args)
+    if args.sources:
+        failed = compile_many(args, cache, peephole)
+        print_stats(args, cache, peephole)
+        exit(1 if failed else 0)
+
     file_name = 'main.c'
-    code = open(file_name).read()
-    node = None
-    token = None
-    try:
-        token = Tokenizer.tokenize(code)
-    except TokenizeError as e:
-        stderr.write(f'{e.position}: {e.args}')
-        exit(1)
-    # print(token)
-    # exit(0)
-    try:
-        node = parse(token)
-    except ErrorReport as e:
-        raw, col = code_index_to_row_col(code, e.code_index)
-        stderr.write(f'{raw} : {col} : {", ".join(e.args)}')
-        exit(1)
-    CodeGenerator().generate(node)
+    if args.run:
+        with open_source(file_name) as code:
+            try:
+                status = run_source(code, SourceMap(code), args)
+            except CompileError as e:
+                report(e)
+        exit(status)
+
+    assembler = Assembler() if args.elf else None
+    out: Optional[TextIO] = stdout
+    if assembler is not None:
+        out = open(args.output + '.s', 'w') if args.keep_asm else None
+    with open_source(file_name) as code:
+        source_map = SourceMap(code)
+        try:
+            if args.stream:
+                compile_stream(code, source_map, args, out, assembler, peephole)
+            else:
+                compile_batch(code, source_map, args, out, cache, assembler, peephole)
+            if assembler is not None:
+                link(assembler, args.output)
+        except CompileError as e:
+            report(e)
+        except AssembleError as e:
+            stderr.write(f'assemble : {e}\n')
+            exit(1)
+        finally:
+            if out is not None and out is not stdout:
+                out.close()
+    print_stats(args, cache, peephole)
 
     # stderr.write(str(node))
 
@@ -1,9 +1,9 @@
-from typing import List
+from typing import List, Iterator
 
 from .parser import Parser
 from .parser.base import ParseError, Unmatch
 from .node import Node
-from tokenor import Token
+from tokenor import TokenSource, TokenStream
 
 
 class ErrorReport(ValueError):
@@ -17,24 +17,48 @@ class ErrorReport(ValueError):
         return f'code index {self.code_index}: {" ".join(self.args)}'
 
 
-def parse(tokens: List[Token]) -> List[Node]:
-    from .variable_validator import VariableValidator, VarNameError
-    from .typor import Typor, TypingError
+def parse(tokens: TokenSource) -> List[Node]:
+    from .analyzer import Analyzer
+    from .variable_validator import VarNameError
+    from .typor import TypingError
     try:
         nodes = Parser().parse(tokens)
     except ParseError as e:
-        raise ErrorReport(tokens[e.position].position, *e.args)
+        raise ErrorReport(tokens.position_at(e.position), *e.args)
     except Unmatch as e:
-        raise ErrorReport(tokens[e.position].position, 'InnerError: ', *e.args)
+        raise ErrorReport(tokens.position_at(e.position), 'InnerError: ', *e.args)
 
     try:
-        VariableValidator().crawl(nodes)
+        Analyzer().analyze(nodes)
     except VarNameError as e:
-        raise ErrorReport(tokens[e.position].position, *e.args)
-
-    try:
-        Typor().typing(nodes)
+        raise ErrorReport(tokens.position_at(e.position), *e.args)
     except TypingError as e:
-        raise ErrorReport(tokens[e.node.position].position, *e.args)
+        raise ErrorReport(tokens.position_at(e.node.position), *e.args)
 
     return nodes
+
+
+def parse_iter(tokens: TokenStream) -> Iterator[Node]:
+    from .analyzer import Analyzer
+    from .variable_validator import VarNameError
+    from .typor import TypingError
+    statements = Parser().parse_iter(tokens)
+    analyzer = Analyzer()
+    while True:
+        try:
+            node = next(statements)
+        except StopIteration:
+            return
+        except ParseError as e:
+            raise ErrorReport(tokens.position_at(e.position), *e.args)
+        except Unmatch as e:
+            raise ErrorReport(tokens.position_at(e.position), 'InnerError: ', *e.args)
+
+        try:
+            analyzer.check(node)
+        except VarNameError as e:
+            raise ErrorReport(tokens.position_at(e.position), *e.args)
+        except TypingError as e:
+            raise ErrorReport(tokens.position_at(e.node.position), *e.args)
+
+        yield node
@@ -0,0 +1,30 @@
+from typing import Iterable
+
+from .. import node as node_type
+from ..node import Node
+from ..type import Type
+from ..typor import Typor
+from ..variable_validator import VarNameError
+from ..variable_validator.scope import Scope, NotExist
+
+
+class Analyzer(Typor):
+    # 名前解決と型付けを 1 回の走査でやる
+    scope: Scope
+
+    def __init__(self) -> None:
+        self.scope = Scope()
+
+    def analyze(self, nodes: Iterable[Node]) -> None:
+        self.crawl(nodes)
+
+    def variable(self, node: node_type.Variable) -> Type:
+        try:
+            symbol = self.scope.lookup(node.name)
+        except NotExist:
+            raise VarNameError(node.position, f'name {node.name} is not defined')
+        var = self.scope.symbols[symbol]
+        node.symbol = symbol
+        node.offset = var.offset
+        node.type = var.type
+        return super().variable(node)
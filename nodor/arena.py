@@ -0,0 +1,233 @@
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, TypeVar, Hashable, Any
+from array import array
+from enum import IntEnum
+
+from . import node as node_type
+from .node import Node
+from .type import Type
+
+
+class Kind(IntEnum):
+    INTEGER = 0
+    VARIABLE = 1
+    ASSIGN = 2
+    ADD = 3
+    MUL = 4
+
+
+node_kind: Dict[type, Kind] = {
+    node_type.Integer: Kind.INTEGER,
+    node_type.Variable: Kind.VARIABLE,
+    node_type.Assign: Kind.ASSIGN,
+    node_type.Add: Kind.ADD,
+    node_type.Mul: Kind.MUL,
+}
+
+# 行を積むときは Enum より速い素の int で引く
+kind_code: Dict[type, int] = {node_class: int(kind) for node_class, kind in node_kind.items()}
+INTEGER, VARIABLE, ASSIGN = int(Kind.INTEGER), int(Kind.VARIABLE), int(Kind.ASSIGN)
+
+binary_node: Dict[Kind, type] = {
+    Kind.ASSIGN: node_type.Assign,
+    Kind.ADD: node_type.Add,
+    Kind.MUL: node_type.Mul,
+}
+
+NONE = -1
+
+K = TypeVar('K', bound=Hashable)
+
+
+class NodeArena:
+    # 1 ノード 1 行の並列配列. 子と型と値は添字で持つ
+    kinds: 'array[int]'
+    positions: 'array[int]'
+    lefts: 'array[int]'
+    rights: 'array[int]'
+    type_ids: 'array[int]'
+    values: 'array[int]'
+
+    types: List[Optional[Type]]
+    literals: List[Tuple[int, str, str]]
+    symbols: List[Tuple[str, Optional[int], Optional[int]]]  # (名前, オフセット, シンボル ID)
+
+    def __init__(self) -> None:
+        self.kinds = array('B')
+        self.positions = array('i')
+        self.lefts = array('i')
+        self.rights = array('i')
+        self.type_ids = array('i')
+        self.values = array('i')
+        self.types = []
+        self.literals = []
+        self.symbols = []
+        self._type_index: Dict[int, int] = {}
+        self._literal_index: Dict[Tuple[int, str, str], int] = {}
+        self._symbol_index: Dict[Tuple[str, Optional[int], Optional[int]], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # 引き表は表から作り直せるので持たない. 型の引き表は id で引くので pickle をまたげない
+        return {name: value for name, value in self.__dict__.items() if not name.startswith('_')}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._type_index = {id(ty): i for i, ty in enumerate(self.types)}
+        self._literal_index = {key: i for i, key in enumerate(self.literals)}
+        self._symbol_index = {key: i for i, key in enumerate(self.symbols)}
+
+    def extend(self, nodes: Iterable[Node]) -> List[int]:
+        return [self.add(node) for node in nodes]
+
+    def add(self, root: Node) -> int:
+        # 帰りがけ順に積むので子は必ず親より前の行になる. 深い木でも再帰しないよう明示スタックで辿る
+        done: List[int] = []
+        stack: List[Tuple[Node, bool]] = [(root, False)]
+        while stack:
+            node, visited = stack.pop()
+            kind = kind_code[type(node)]
+            if kind < ASSIGN:
+                done.append(self.append(node, kind, NONE, NONE))
+            elif visited:
+                right = done.pop()
+                left = done.pop()
+                done.append(self.append(node, kind, left, right))
+            else:
+                stack.append((node, True))
+                stack.append((node.right, False))  # type: ignore
+                stack.append((node.left, False))  # type: ignore
+        return done[0]
+
+    def append(self, node: Node, kind: int, left: int, right: int) -> int:
+        if kind == INTEGER:
+            value = self.intern(self._literal_index, self.literals, (node.value, node.prefix, node.suffix))  # type: ignore
+        elif kind == VARIABLE:
+            value = self.intern(self._symbol_index, self.symbols, (node.name, node.offset, node.symbol))  # type: ignore
+        else:
+            value = NONE
+        self.kinds.append(kind)
+        self.positions.append(node.position)
+        self.lefts.append(left)
+        self.rights.append(right)
+        self.type_ids.append(self.type_id(node.type))
+        self.values.append(value)
+        return len(self.kinds) - 1
+
+    def type_id(self, ty: Optional[Type]) -> int:
+        if ty is None:
+            return NONE
+        i = self._type_index.get(id(ty))
+        if i is None:
+            i = self._type_index[id(ty)] = len(self.types)
+            self.types.append(ty)
+        return i
+
+    @staticmethod
+    def intern(index: Dict[K, int], table: List[K], key: K) -> int:
+        i = index.get(key)
+        if i is None:
+            i = index[key] = len(table)
+            table.append(key)
+        return i
+
+    def __getitem__(self, index: int) -> 'ArenaNode':
+        return ArenaNode(self, index)
+
+    def __iter__(self) -> Iterator['ArenaNode']:
+        for i in range(len(self)):
+            yield ArenaNode(self, i)
+
+    def to_node(self, root: int) -> Node:
+        # 行は子が先に並んでいるので root までの範囲を前から組み立てればよい
+        built: Dict[int, Node] = {}
+        stack = [root]
+        order: List[int] = []
+        while stack:
+            i = stack.pop()
+            order.append(i)
+            if self.lefts[i] != NONE:
+                stack.append(self.lefts[i])
+                stack.append(self.rights[i])
+        for i in reversed(order):
+            built[i] = self.build(i, built)
+        return built[root]
+
+    def build(self, i: int, built: Dict[int, Node]) -> Node:
+        kind = self.kinds[i]
+        ty = self.types[self.type_ids[i]] if self.type_ids[i] != NONE else None
+        if kind == Kind.INTEGER:
+            value, prefix, suffix = self.literals[self.values[i]]
+            return node_type.Integer(self.positions[i], value, prefix, suffix, ty)  # type: ignore
+        if kind == Kind.VARIABLE:
+            name, offset, symbol = self.symbols[self.values[i]]
+            return node_type.Variable(self.positions[i], name, offset, ty, symbol)
+        return binary_node[Kind(kind)](self.positions[i], built.pop(self.lefts[i]), built.pop(self.rights[i]), ty)
+
+
+class ArenaNode:
+    __slots__ = ('arena', 'index')
+
+    arena: NodeArena
+    index: int
+
+    def __init__(self, arena: NodeArena, index: int) -> None:
+        self.arena = arena
+        self.index = index
+
+    @property
+    def kind(self) -> Kind:
+        return Kind(self.arena.kinds[self.index])
+
+    @property
+    def position(self) -> int:
+        return self.arena.positions[self.index]
+
+    @property
+    def left(self) -> Optional['ArenaNode']:
+        i = self.arena.lefts[self.index]
+        return None if i == NONE else ArenaNode(self.arena, i)
+
+    @property
+    def right(self) -> Optional['ArenaNode']:
+        i = self.arena.rights[self.index]
+        return None if i == NONE else ArenaNode(self.arena, i)
+
+    @property
+    def type(self) -> Optional[Type]:
+        i = self.arena.type_ids[self.index]
+        return None if i == NONE else self.arena.types[i]
+
+    @property
+    def value(self) -> int:
+        if self.kind != Kind.INTEGER:
+            raise AttributeError('value')
+        return self.arena.literals[self.arena.values[self.index]][0]
+
+    @property
+    def name(self) -> str:
+        if self.kind != Kind.VARIABLE:
+            raise AttributeError('name')
+        return self.arena.symbols[self.arena.values[self.index]][0]
+
+    @property
+    def offset(self) -> Optional[int]:
+        if self.kind != Kind.VARIABLE:
+            raise AttributeError('offset')
+        return self.arena.symbols[self.arena.values[self.index]][1]
+
+    @property
+    def symbol(self) -> Optional[int]:
+        if self.kind != Kind.VARIABLE:
+            raise AttributeError('symbol')
+        return self.arena.symbols[self.arena.values[self.index]][2]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ArenaNode) and other.arena is self.arena and other.index == self.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.arena), self.index))
+
+    def __repr__(self) -> str:
+        return f'ArenaNode({self.kind.name}, {self.index})'
@@ -28,6 +28,7 @@ class Variable(BaseNode):
     name: str
     offset: Optional[int] = None
     type: Optional[Type] = None
+    symbol: Optional[int] = None
 
     def __str__(self) -> str:
         return f'{str(self.type) if self.type is not None else "nonTyped"} {self.name}'
@@ -0,0 +1,81 @@
+from typing import List, Iterable, Optional, Callable
+
+from .. import node as node_type
+from ..node import Node
+from ..type import Int
+from crawler import Crawler, pre_order
+
+
+def has_side_effect(node: Node) -> bool:
+    return any(isinstance(n, node_type.Assign) for n in pre_order(node))
+
+
+def same_width(a: Node, b: Node) -> bool:
+    return isinstance(a.type, Int) and isinstance(b.type, Int) \
+        and a.type.size == b.type.size and a.type.signed == b.type.signed
+
+
+class ConstantFolder(Crawler[Node]):
+    # Typor の後に走らせる. 畳んだノードも型を持ったままなので generator にそのまま渡せる.
+    # 畳んだ値は後ろの generator と同じにする. AST の generator は + * を 64bit で計算して代入でだけ切り詰め,
+    # IR はノードごとに型の幅で wrap する (wrap_to_type)
+    iterative = True
+
+    wrap_to_type: bool
+
+    def __init__(self, wrap_to_type: bool = False) -> None:
+        self.wrap_to_type = wrap_to_type
+
+    def fold(self, nodes: Iterable[Node]) -> List[Node]:
+        return [self.check(node) for node in nodes]
+
+    def integer(self, node: node_type.Integer) -> Node:
+        return node
+
+    def variable(self, node: node_type.Variable) -> Node:
+        return node
+
+    def assign(self, node: node_type.Assign) -> Node:
+        node.right = self.check(node.right)
+        return node
+
+    def add(self, node: node_type.Add) -> Node:
+        left = node.left = self.check(node.left)
+        right = node.right = self.check(node.right)
+        if (folded := self.fold_integers(node, lambda a, b: a + b)) is not None:
+            return folded
+        if self.is_value(right, 0) and same_width(left, node):
+            return left
+        if self.is_value(left, 0) and same_width(right, node):
+            return right
+        return node
+
+    def mul(self, node: node_type.Mul) -> Node:
+        left = node.left = self.check(node.left)
+        right = node.right = self.check(node.right)
+        if (folded := self.fold_integers(node, lambda a, b: a * b)) is not None:
+            return folded
+        if self.is_value(right, 1) and same_width(left, node):
+            return left
+        if self.is_value(left, 1) and same_width(right, node):
+            return right
+        if (self.is_value(right, 0) and not has_side_effect(left)) \
+                or (self.is_value(left, 0) and not has_side_effect(right)):
+            return self.integer_node(node, 0)
+        return node
+
+    def fold_integers(self, node: node_type.BinaryOperator, op: Callable[[int, int], int]) -> Optional[Node]:
+        if isinstance(node.left, node_type.Integer) and isinstance(node.right, node_type.Integer):
+            return self.integer_node(node, op(node.left.value, node.right.value))
+        return None
+
+    def wrap(self, ty: Int, value: int) -> int:
+        return ty.wrap(value) if self.wrap_to_type else value & 0xffffffffffffffff
+
+    def integer_node(self, node: node_type.BinaryOperator, value: int) -> node_type.Integer:
+        if not isinstance(node.type, Int):
+            raise ValueError('fold untyped node')
+        return node_type.Integer(node.position, self.wrap(node.type, value), None, None, node.type)  # type: ignore
+
+    def is_value(self, node: Node, value: int) -> bool:
+        return isinstance(node, node_type.Integer) and isinstance(node.type, Int) and self.wrap(node.type, node.value) == value
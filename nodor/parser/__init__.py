@@ -1,16 +1,23 @@
-from typing import List
+from typing import List, Iterator
 
 from ..node import Node
-from tokenor import Token, TokenType
+from tokenor import Token, TokenType, TokenStream, TokenSource
 from .statement_parser import StatementParser
 
 
 class Parser(StatementParser):
 
-    def parse(self, tokens: List[Token]) -> List[Node]:
+    def parse(self, tokens: TokenSource) -> List[Node]:
         self.tokens = tokens
         self.p = 0
         nodes = []
         while not self.consume(TokenType.EOF):
             nodes.append(self.expression_statement())
         return nodes
+
+    def parse_iter(self, tokens: TokenStream) -> Iterator[Node]:
+        self.tokens = tokens
+        self.p = 0
+        while not self.consume(TokenType.EOF):
+            tokens.release(self.p)
+            yield self.expression_statement()
@@ -1,6 +1,6 @@
 from typing import List, Callable, Union, Sequence, Any, Generic, TypeVar, Optional
 
-from tokenor import Token, TokenType
+from tokenor import Token, TokenType, TokenSource, TokenKind
 from ..node import Node
 
 
@@ -23,27 +23,12 @@ class ParseError(Exception):
         self.position = position
 
 
-def unmatch_is_error(fn: Callable[[], T], info: Optional[str] = None) -> T:
-    try:
-        return fn()
-    except Unmatch as e:
-        raise ParseError(e.position, *([info] if info is not None else e.args))
-
-
 class Base:
     p: int
 
-    def select(self, *funcs: Callable[[], Node]) -> Node:
-        for i in range(len(funcs)):
-            try:
-                return funcs[i]()
-            except Unmatch as e:
-                continue
-        raise Unmatch(self.p, 'select unmatched')
-
 
 class BaseParser(Base):
-    tokens: List[Token]
+    tokens: TokenSource
 
     def token(self) -> Token:
         try:
@@ -51,21 +36,20 @@ class BaseParser(Base):
         except IndexError:
             raise Unmatch(self.p, 'token index out of range')
 
-    def consume(self, token_type: Union[TokenType, str]) -> Optional[Token]:
-        try:
-            token = self.token()
-        except Unmatch:
-            return None
-        if token.type == token_type:
+    def peek(self) -> TokenKind:
+        return self.tokens.type_at(self.p)
+
+    def value(self, index: int) -> str:
+        value = self.tokens.value_at(index)
+        if value is None:
+            raise Unmatch(index, 'token has no value')
+        return value
+
+    def consume(self, token_type: TokenKind) -> bool:
+        if self.tokens.type_at(self.p) == token_type:
             self.p += 1
-            return token
-        return None
-
-    def binary_expression(self, fn: Callable[[], Node], token_type: str, nd: Callable[[int, Node, Node], Node]) -> Node:
-        result = fn()
-        while (token := self.consume(token_type)):
-            result = nd(self.p-1, result, unmatch_is_error(fn, 'no left operand'))
-        return result
+            return True
+        return False
 
 
 class TokenParser(Base):
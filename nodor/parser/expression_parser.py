@@ -1,10 +1,10 @@
-from typing import List, Union, Callable, Optional, Tuple, Dict
+from typing import List, Union, Callable, Optional, Tuple, Dict, NamedTuple
 from dataclasses import dataclass
 from string import hexdigits, octdigits, digits
 import re
 
-from tokenor import Token, TokenType, Tokenizer
-from .base import BaseParser, TokenParser, Unmatch, ParseError, unmatch_is_error
+from tokenor import Token, TokenType, Tokenizer, TokenKind
+from .base import BaseParser, TokenParser, Unmatch, ParseError
 from ..node import *
 
 integer_re = re.compile(r'^(?P<prefix>0[a-zA-Z]?)?(?P<value>[0-9a-fA-F]+)(?P<suffix>[a-zA-Z]+)?$')
@@ -13,48 +13,91 @@ int_value_re = re.compile(r'^(?P<value>[1-9a-fA-F][0-9a-fA-F]*)')
 number_suffix_re = re.compile(r'^(?P<suffix>[a-zA-Z]+)?$')
 
 
-class ExpressionParser(BaseParser):
+class Operator(NamedTuple):
+    binding_power: int
+    right_assoc: bool
+    node: Callable[[int, Expression, Expression], Expression]
 
-    def expression(self) -> Expression:
-        return self.assign()
 
-    def assign(self) -> Expression:
-        result = self.add()
-        while True:
-            if (token := self.consume('=')):
-                result = Assign(self.p-1, result, unmatch_is_error(self.assign, 'no left operand'))
-                continue
-            break
-        return result
+# 二項演算子は表に足すだけで増やせる
+binary_operators: Dict[TokenKind, Operator] = {
+    '=': Operator(10, True, Assign),
+    '+': Operator(20, False, Add),
+    '*': Operator(30, False, Mul),
+}
 
-    def add(self) -> Expression:
-        return self.binary_expression(self.mul, '+', Add)
 
-    def mul(self) -> Expression:
-        return self.binary_expression(self.primary_expression, '*', Mul)
+class ExpressionParser(BaseParser):
 
-    def primary_expression(self) -> Expression:
-        return self.select(self.number, self.variable, self.bracket)
+    def expression(self) -> Expression:
+        # 再帰せず演算子スタックと被演算子スタックで組み立てる (precedence climbing)
+        operands: List[Expression] = []
+        operators: List[Tuple[Optional[Operator], int]] = []  # None は '('
+        open_brackets = 0
+        info = 'expected expression'
 
-    def bracket(self) -> Expression:
-        if self.consume('('):
-            result = self.expression()
-            if not self.consume(')'):
-                raise ParseError(self.p, 'no ")"')
-            return result
-        raise Unmatch(self.p, 'no "("')
+        while True:
+            while self.peek() == '(':
+                operators.append((None, self.p))
+                open_brackets += 1
+                self.p += 1
+                info = 'expected expression'
+
+            operand = self.operand_table.get(self.peek())
+            if operand is None:
+                raise ParseError(self.p, info)
+            operands.append(operand(self))
+
+            while True:
+                kind = self.peek()
+                op = binary_operators.get(kind)
+                if op is not None:
+                    while operators:
+                        top = operators[-1][0]
+                        if top is None or top.binding_power < op.binding_power \
+                                or (top.binding_power == op.binding_power and op.right_assoc):
+                            break
+                        self.reduce(operands, operators)
+                    operators.append((op, self.p))
+                    self.p += 1
+                    info = 'no left operand'
+                    break
+
+                if kind == ')' and open_brackets:
+                    while operators[-1][0] is not None:
+                        self.reduce(operands, operators)
+                    operators.pop()
+                    open_brackets -= 1
+                    self.p += 1
+                    continue
+
+                if open_brackets:
+                    raise ParseError(self.p, 'no ")"')
+                while operators:
+                    self.reduce(operands, operators)
+                return operands[0]
+
+    @staticmethod
+    def reduce(operands: List[Expression], operators: List[Tuple[Optional[Operator], int]]) -> None:
+        op, position = operators.pop()
+        assert op is not None
+        right = operands.pop()
+        operands[-1] = op.node(position, operands[-1], right)
 
     def number(self) -> Number:
-        if self.token().type == TokenType.NUMBER:
-            num = NumberParser().parse(self.token(), self.p)
-            self.p += 1
-            return num
-        raise Unmatch(self.p, 'not number')
+        num = NumberParser.integer(self.value(self.p), self.p)
+        self.p += 1
+        return num
 
     def variable(self) -> Variable:
-        if (token := self.consume(TokenType.IDENT)):
-            return Variable(self.p-1, token.value)
-        raise Unmatch(self.p, 'not variable')
+        self.p += 1
+        return Variable(self.p-1, self.value(self.p-1))
+
+    # 先頭トークンで被演算子を選ぶ
+    operand_table: Dict[TokenKind, Callable[['ExpressionParser'], Expression]] = {
+        TokenType.NUMBER: number,
+        TokenType.IDENT: variable,
+    }
 
 
 class NumberParser(TokenParser):
@@ -68,7 +111,7 @@ class NumberParser(TokenParser):
         m = integer_re.match(s)
 
         if m is None:
-            raise Unmatch(position, 'not integer')
+            raise ParseError(position, 'not integer')
 
         v = m.groupdict()
         prefix, value, suffix = v['prefix'], v['value'], v['suffix']
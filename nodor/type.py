@@ -1,4 +1,4 @@
-from typing import List, Optional, Union
+from typing import List, Optional, Union, Dict, Tuple, Any, ClassVar
 from enum import Enum, auto
 from dataclasses import dataclass
 from collections import Counter
@@ -15,23 +15,68 @@ class QUALIFIER(Enum):
     atomic = auto()
 
 
+# storage class / qualifier はビットで持つ
+TYPEDEF = 1 << 0
+EXTERN = 1 << 1
+STATIC = 1 << 2
+THREAD_LOCAL = 1 << 3
+AUTO = 1 << 4
+REGISTER = 1 << 5
+
+CONST = 1 << 0
+RESTRICT = 1 << 1
+VOLATILE = 1 << 2
+ATOMIC = 1 << 3
+
+qualifier_bit: Dict[QUALIFIER, int] = {
+    QUALIFIER.const: CONST,
+    QUALIFIER.restrict: RESTRICT,
+    QUALIFIER.volatile: VOLATILE,
+    QUALIFIER.atomic: ATOMIC,
+}
+
+
+def storage_class_bits(sc: storage_class) -> int:
+    bits = 0
+    for flag, bit in zip(sc, (TYPEDEF, EXTERN, STATIC, THREAD_LOCAL, AUTO, REGISTER)):
+        if flag:
+            bits |= bit
+    return bits
+
+
+def qualifier_bits(q: Optional[QUALIFIER]) -> int:
+    return 0 if q is None else qualifier_bit[q]
+
+
 # types
 
 class StorageClass(metaclass=ABCMeta):
-    typedef: bool = False
-    extern: bool = False
-    static: bool = False
-    thread_local: bool = False
-    auto: bool = True
-    register: bool = False
-
-    def set_storage_class(self, sc: storage_class) -> None:
-        self.typedef = sc.typedef
-        self.extern = sc.extern
-        self.static = sc.static
-        self.thread_local = sc.thread_local
-        self.auto = sc.auto
-        self.register = sc.register
+    __slots__ = ()
+    storage_bits: int = AUTO
+
+    @property
+    def typedef(self) -> bool:
+        return bool(self.storage_bits & TYPEDEF)
+
+    @property
+    def extern(self) -> bool:
+        return bool(self.storage_bits & EXTERN)
+
+    @property
+    def static(self) -> bool:
+        return bool(self.storage_bits & STATIC)
+
+    @property
+    def thread_local(self) -> bool:
+        return bool(self.storage_bits & THREAD_LOCAL)
+
+    @property
+    def auto(self) -> bool:
+        return bool(self.storage_bits & AUTO)
+
+    @property
+    def register(self) -> bool:
+        return bool(self.storage_bits & REGISTER)
 
     def __str__(self) -> str:
         typedef = 'typedef' if self.typedef else ''
@@ -44,28 +89,24 @@ class StorageClass(metaclass=ABCMeta):
 
 
 class Qualifier(metaclass=ABCMeta):
-    const: bool = False
-    restrict: bool = False
-    volatile: bool = False
-    atomic: bool = False
-
-    def set_qualifier(self, q: Optional[QUALIFIER]) -> None:
-        if q == QUALIFIER.const:
-            self.const = True
-        elif q == QUALIFIER.restrict:
-            self.restrict = True
-        elif q == QUALIFIER.volatile:
-            self.volatile = True
-        elif q == QUALIFIER.atomic:
-            self.atomic = True
-
-        if not self.qualifier_validate():
-            raise ValueError('qualifier is only one')
-
-    def qualifier_validate(self) -> bool:
-        if [self.const, self.restrict, self.volatile, self.atomic].count(True) > 1:
-            return False
-        return True
+    __slots__ = ()
+    qualifier_bits: int = 0
+
+    @property
+    def const(self) -> bool:
+        return bool(self.qualifier_bits & CONST)
+
+    @property
+    def restrict(self) -> bool:
+        return bool(self.qualifier_bits & RESTRICT)
+
+    @property
+    def volatile(self) -> bool:
+        return bool(self.qualifier_bits & VOLATILE)
+
+    @property
+    def atomic(self) -> bool:
+        return bool(self.qualifier_bits & ATOMIC)
 
     def __str__(self) -> str:
         if self.const:
@@ -80,6 +121,7 @@ class Qualifier(metaclass=ABCMeta):
 
 
 class Base(StorageClass, Qualifier, metaclass=ABCMeta):
+    __slots__ = ()
     size: Optional[int] = None
     is_literal_or_calc: bool = False
 
@@ -107,21 +149,66 @@ class Base(StorageClass, Qualifier, metaclass=ABCMeta):
 
 
 class Arithmetic(Base, metaclass=ABCMeta):
+    __slots__ = ()
     signed: bool = True
 
+    def wrap(self, value: int) -> int:
+        # size ビットに丸めたビット列 (0 以上) を返す. レジスタにはこれがゼロ拡張されて入る
+        if self.size is None:
+            raise ValueError('unknown size')
+        return value & ((1 << self.size) - 1)
 
-class Int(Arithmetic):
+    def interpret(self, value: int) -> int:
+        # wrap したビット列を符号の有無に従って整数として読む
+        value = self.wrap(value)
+        if self.signed and self.size is not None and value >> (self.size - 1):
+            return value - (1 << self.size)
+        return value
 
-    def __init__(self, size: int, signed: bool, is_literal_or_calc: bool,
-                 storage_classes: Optional[storage_class], qualifier: Optional[QUALIFIER]):
-        self.size = size
-        self.signed = signed
-        self.is_literal_or_calc = is_literal_or_calc
-        if not is_literal_or_calc:
+
+IntKey = Tuple[int, bool, bool, int, int]
+
+
+class Int(Arithmetic):
+    # (size, signed, is_literal_or_calc, storage bits, qualifier bits) ごとに 1 つだけ作って共有する.
+    # 同じ型なら同じインスタンスなので, 型の比較は is でよい
+    __slots__ = ('size', 'signed', 'is_literal_or_calc', 'storage_bits', 'qualifier_bits')
+    size: int
+    interned: ClassVar[Dict[IntKey, 'Int']] = {}
+
+    def __new__(cls, size: int, signed: bool, is_literal_or_calc: bool,
+                storage_classes: Optional[storage_class], qualifier: Optional[QUALIFIER]) -> 'Int':
+        if is_literal_or_calc:
+            key = (size, signed, True, AUTO, 0)
+        else:
             if storage_classes is None:
                 raise ValueError('is_literal_or_calc is False but storage_classes or qualifier is None')
-            self.set_storage_class(storage_classes)
-            self.set_qualifier(qualifier)
+            key = (size, signed, False, storage_class_bits(storage_classes), qualifier_bits(qualifier))
+        return cls.intern(key)
+
+    @classmethod
+    def intern(cls, key: IntKey) -> 'Int':
+        ty = cls.interned.get(key)
+        if ty is None:
+            ty = object.__new__(cls)
+            for name, value in zip(Int.__slots__, key):
+                object.__setattr__(ty, name, value)
+            cls.interned[key] = ty
+        return ty
+
+    def __init__(self, size: int, signed: bool, is_literal_or_calc: bool,
+                 storage_classes: Optional[storage_class], qualifier: Optional[QUALIFIER]) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Int is immutable')
+
+    def __reduce__(self) -> Tuple[Any, Tuple[IntKey]]:
+        return Int.intern, (self.key,)
+
+    @property
+    def key(self) -> IntKey:
+        return self.size, self.signed, self.is_literal_or_calc, self.storage_bits, self.qualifier_bits
 
     def __str__(self) -> str:
         if not self.is_literal_or_calc:
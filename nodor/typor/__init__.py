@@ -10,19 +10,32 @@ class TypingError(Exception):
     node: Node
 
     def __init__(self, node: Node, *args: str) -> None:
-        super().__init__(args)
+        super().__init__(*args)
         self.node = node
 
 
 class Typor(Crawler[Type]):
+    iterative = True
 
     def typing(self, nodes: List[Node]) -> None:
         self.crawl(nodes)
 
     def integer(self, node: node_type.Integer) -> Type:
         suffix = '' if node.suffix is None else node.suffix.lower()
-        signed = 'u' not in suffix
+        unsigned = 'u' in suffix
         size = 64 if 'l' in suffix else 32
+        # 値が収まる最初の型にする (C11 6.4.4.1). 10 進数以外は unsigned にも広がる
+        if unsigned:
+            candidates = [(s, False) for s in (32, 64) if s >= size]
+        elif node.prefix is None:
+            candidates = [(s, True) for s in (32, 64) if s >= size]
+        else:
+            candidates = [(s, signed) for s in (32, 64) if s >= size for signed in (True, False)]
+        for size, signed in candidates:
+            if node.value < 1 << (size - 1 if signed else size):
+                break
+        else:
+            size, signed = 64, False
         ty = Int(size, signed, True, None, None)
         node.type = ty
         return ty
@@ -15,6 +15,7 @@ class VarNameError(NameError):
 
 
 class VariableValidator(Crawler[None]):
+    iterative = True
     scope: Scope
 
     def __init__(self) -> None:
@@ -25,11 +26,13 @@ class VariableValidator(Crawler[None]):
 
     def variable(self, node: node_type.Variable) -> None:
         try:
-            var = self.scope.exist(node.name)
-            node.offset = var.offset
-            node.type = var.type
+            symbol = self.scope.lookup(node.name)
         except NotExist:
             raise VarNameError(node.position, f'name {node.name} is not defined')
+        var = self.scope.symbols[symbol]
+        node.symbol = symbol
+        node.offset = var.offset
+        node.type = var.type
 
     def assign(self, node: node_type.Assign) -> None:
         self.check(node.left)
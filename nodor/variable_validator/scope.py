@@ -1,38 +1,69 @@
-from typing import List, Deque
-from dataclasses import dataclass
-from collections import deque
+from typing import List, Dict
 
 from ..type import Type, Int, storage_class, QUALIFIER
 from ..node import Variable
 
 
-Block = List[Variable]
+class NotExist(Exception):
+    pass
 
 
-class NotExist(Exception):
+class AlreadyExist(Exception):
+    pass
+
+
+class OutermostBlock(Exception):
     pass
 
 
 class Scope:
-    scope: Deque[Block]
+    # 名前 -> 束縛 (シンボル ID) のスタック. ブロックを出るときは blocks に積んだ名前で束縛を戻す
+    bindings: Dict[str, List[int]]
+    blocks: List[List[str]]
+    symbols: List[Variable]
+    depths: List[int]
 
     def __init__(self) -> None:
         from string import ascii_lowercase
-        self.scope = deque()
-        self.scope.append([])
-        self.scope[0].append(Variable(0, 'aa', 4, Int(32, True, False, storage_class(False, False, False, False, True, False), None)))
+        self.bindings = {}
+        self.blocks = [[]]
+        self.symbols = []
+        self.depths = []
+        self.declare(Variable(0, 'aa', 4, Int(32, True, False, storage_class(False, False, False, False, True, False), None)))
         for i, v in enumerate(ascii_lowercase[1:]):
-            self.scope[0].append(Variable(0, v*2, (i + 1) * 8 + 4, Int(64, True, False, storage_class(False, False, False, False, True, False), None)))
+            self.declare(Variable(0, v*2, (i + 1) * 8 + 4, Int(64, True, False, storage_class(False, False, False, False, True, False), None)))
+
+    def enter(self) -> None:
+        self.blocks.append([])
+
+    def leave(self) -> None:
+        # 一番外のブロックには aa ~ zz の束縛がある. enter と対になっていない leave は間違い
+        if len(self.blocks) == 1:
+            raise OutermostBlock
+        for name in reversed(self.blocks.pop()):
+            stack = self.bindings[name]
+            stack.pop()
+            if not stack:
+                del self.bindings[name]
+
+    def declare(self, var: Variable) -> int:
+        depth = len(self.blocks) - 1
+        stack = self.bindings.setdefault(var.name, [])
+        if stack and self.depths[stack[-1]] == depth:
+            raise AlreadyExist(var.name)
+        symbol = len(self.symbols)
+        self.symbols.append(var)
+        self.depths.append(depth)
+        stack.append(symbol)
+        self.blocks[-1].append(var.name)
+        var.symbol = symbol
+        return symbol
+
+    def lookup(self, name: str) -> int:
+        stack = self.bindings.get(name)
+        if not stack:
+            raise NotExist
+        return stack[-1]
 
     def exist(self, name: str) -> Variable:
-        for block in list(self.scope)[::-1]:
-            if (v := self.is_exist(block, name)):
-                return v
-        raise NotExist
-
-    @staticmethod
-    def is_exist(block: Block, name: str) -> Variable:
-        for v in block:
-            if v.name == name:
-                return v
-        raise NotExist
+        return self.symbols[self.lookup(name)]
@@ -1,13 +1,12 @@
-from typing import List, Union, Any, Optional
+from typing import List, Union, Any, Optional, Iterator, Deque, Dict, Callable, Tuple, TypeVar, AnyStr, Match
+from array import array
+from mmap import mmap
+from collections import deque
 from enum import Enum, auto
 from dataclasses import dataclass
 from string import whitespace, digits, hexdigits, ascii_letters, ascii_lowercase
 import re
 
-number_literal_chars = set(digits + ascii_letters + '.')
-ident_first_chars = set(ascii_letters + '_')
-ident_chars = set(ascii_letters + '_' + digits)
-
 token_single = '+*;=()'
 alphabet_token = ['do',
                   'if',
@@ -54,7 +53,15 @@ alphabet_token = ['do',
                   '_Thread_local',
                   '_Static_assert']
 
-alphabet_token_re = [re.compile(i + r'([^a-zA-Z0-9_]|$)') for i in alphabet_token]
+token_pattern = (f'(?P<space>[{re.escape(whitespace)}]+)'
+                 f'|(?P<single>[{re.escape(token_single)}])'
+                 r'|(?P<number>[0-9][0-9a-zA-Z.]*)'
+                 r'|(?P<ident>[a-zA-Z_][a-zA-Z0-9_]*)')
+token_re = re.compile(token_pattern)
+token_bytes_re = re.compile(token_pattern.encode())
+
+Source = Union[str, bytes, mmap]
+S = TypeVar('S', bound=Source)
 
 
 class TokenType(Enum):
@@ -63,74 +70,180 @@ class TokenType(Enum):
     EOF = auto()
 
 
+TokenKind = Union[str, TokenType]
+
+# TokenBuffer に詰める型コード
+token_kinds: List[TokenKind] = [TokenType.NUMBER, TokenType.IDENT, TokenType.EOF, *token_single, *alphabet_token]
+token_kind_code: Dict[TokenKind, int] = {k: i for i, k in enumerate(token_kinds)}
+NUMBER_CODE = token_kind_code[TokenType.NUMBER]
+IDENT_CODE = token_kind_code[TokenType.IDENT]
+EOF_CODE = token_kind_code[TokenType.EOF]
+
+keyword_table = {i: token_kind_code[i] for i in alphabet_token}
+single_table = {i: token_kind_code[i] for i in token_single}
+keyword_bytes_table = {i.encode(): token_kind_code[i] for i in alphabet_token}
+single_bytes_table = {i.encode(): token_kind_code[i] for i in token_single}
+
+
 @dataclass
 class Token:
-    type: Union[str, TokenType]
+    type: TokenKind
     position: int
     value: Any = None
 
-    def __bool__(self) -> bool:
-        try:
-            self.type
-            return True
-        except AttributeError:
-            return False
-
 
 class TokenizeError(Exception):
-    position: Optional[int] = None
+    position: int
     info: Optional[str] = None
 
     def __init__(self, position: int, *args: str) -> None:
-        super().__init__(args)
+        super().__init__(*args)
         self.position = position
 
 
+class TokenBuffer:
+    code: Source
+    types: 'array[int]'
+    starts: 'array[int]'
+    lengths: 'array[int]'
+
+    def __init__(self, code: Source) -> None:
+        self.code = code
+        self.types = array('B')
+        self.starts = array('q')
+        self.lengths = array('L')
+
+    def append(self, kind: int, start: int, end: int) -> None:
+        self.types.append(kind)
+        self.starts.append(start)
+        self.lengths.append(end - start)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def type_at(self, index: int) -> TokenKind:
+        return token_kinds[self.types[index]]
+
+    def position_at(self, index: int) -> int:
+        return self.starts[index]
+
+    def value_at(self, index: int) -> Optional[str]:
+        if self.types[index] not in (NUMBER_CODE, IDENT_CODE):
+            return None
+        start = self.starts[index]
+        value = self.code[start:start + self.lengths[index]]
+        return value if isinstance(value, str) else bytes(value).decode()
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self)
+        return Token(self.type_at(index), self.position_at(index), self.value_at(index))
+
+    def __iter__(self) -> Iterator[Token]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # mmap は pickle できないので中身を bytes にして持つ
+        state = dict(self.__dict__)
+        if isinstance(self.code, mmap):
+            state['code'] = bytes(self.code)
+        return state
+
+
 class Tokenizer:
 
     @staticmethod
-    def tokenize(code: str) -> List[Token]:
+    def tokenize(code: Source) -> TokenBuffer:
+        tokens = TokenBuffer(code)
+        append = tokens.append
+        for kind, start, end in Tokenizer.scan(code):
+            append(kind, start, end)
+        return tokens
+
+    @staticmethod
+    def tokenize_iter(code: Source) -> Iterator[Token]:
+        decode: Callable[[Any], str] = str if isinstance(code, str) else bytes.decode
+        for kind, start, end in Tokenizer.scan(code):
+            if kind == IDENT_CODE or kind == NUMBER_CODE:
+                yield Token(token_kinds[kind], start, decode(code[start:end]))
+            else:
+                yield Token(token_kinds[kind], start)
+
+    @staticmethod
+    def scan(code: Source) -> Iterator[Tuple[int, int, int]]:
+        # str と bytes / mmap で正規表現と表を分ける. 走査そのものは同じ
+        if isinstance(code, str):
+            return Tokenizer.scan_with(code, token_re.match, keyword_table, single_table)
+        return Tokenizer.scan_with(code, token_bytes_re.match, keyword_bytes_table, single_bytes_table)
+
+    @staticmethod
+    def scan_with(code: S, match: Callable[[S, int], Optional[Match[AnyStr]]],
+                  keywords: Dict[AnyStr, int], singles: Dict[AnyStr, int]) -> Iterator[Tuple[int, int, int]]:
         p = 0
         code_len = len(code)
-        tokens: List[Token] = []
 
         while p < code_len:
-            c = code[p]
-
-            if c in whitespace:
-                p += 1
-                continue
-
-            if c in token_single:
-                tokens.append(Token(c, p))
-                p += 1
-                continue
-
-            if c in digits:
-                num = ''
-                first_p = p
-                while p < code_len and (c := code[p]) in number_literal_chars:
-                    num += c
-                    p += 1
-                tokens.append(Token(TokenType.NUMBER, first_p, num))
-                continue
-
-            if c in ident_first_chars:
-                for i, r in enumerate(alphabet_token_re):
-                    if r.match(code[p:]):
-                        tokens.append(Token(alphabet_token[i], p))
-                        p += len(alphabet_token[i])
-                        break
-                else:
-                    ide = ''
-                    first_p = p
-                    while p < code_len and (c := code[p]) in ident_chars:
-                        ide += c
-                        p += 1
-                    tokens.append(Token(TokenType.IDENT, first_p, ide))
-                continue
-
-            raise TokenizeError(p, f'unknown token char: {c}')
-
-        tokens.append(Token(TokenType.EOF, p))
-        return tokens
+            m = match(code, p)
+            if m is None:
+                raise TokenizeError(p, f'unknown token char: {Tokenizer.char_at(code, p)}')
+            kind = m.lastgroup
+            end = m.end()
+
+            if kind == 'ident':
+                yield keywords.get(m.group(), IDENT_CODE), p, end
+            elif kind == 'single':
+                yield singles[m.group()], p, end
+            elif kind == 'number':
+                yield NUMBER_CODE, p, end
+
+            p = end
+
+        yield EOF_CODE, p, p
+
+    @staticmethod
+    def char_at(code: Source, p: int) -> str:
+        if isinstance(code, str):
+            return code[p]
+        return bytes(code[p:p + 4]).decode(errors='replace')[0]
+
+
+class TokenStream:
+    tokens: Deque[Token]
+    base: int
+
+    def __init__(self, tokens: Iterator[Token]) -> None:
+        self.source = tokens
+        self.tokens = deque()
+        self.base = 0
+
+    def __getitem__(self, index: int) -> Token:
+        i = index - self.base
+        if i < 0:
+            raise IndexError(f'token {index} is already released')
+        while i >= len(self.tokens):
+            try:
+                self.tokens.append(next(self.source))
+            except StopIteration:
+                raise IndexError('token index out of range')
+        return self.tokens[i]
+
+    def type_at(self, index: int) -> TokenKind:
+        return self[index].type
+
+    def position_at(self, index: int) -> int:
+        return self[index].position
+
+    def value_at(self, index: int) -> Optional[str]:
+        return self[index].value
+
+    def release(self, index: int) -> None:
+        while self.base < index and self.tokens:
+            self.tokens.popleft()
+            self.base += 1
+
+
+TokenSource = Union[TokenBuffer, TokenStream]
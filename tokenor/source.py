@@ -0,0 +1,43 @@
+from typing import Iterator, List, Tuple, Any
+from bisect import bisect_right
+from contextlib import contextmanager
+from mmap import mmap, ACCESS_READ
+import os
+
+from . import Source
+
+
+@contextmanager
+def open_source(file_name: str) -> Iterator[Source]:
+    with open(file_name, 'rb') as f:
+        # 空ファイルは mmap できない
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap(f.fileno(), 0, access=ACCESS_READ) as m:
+            yield m
+
+
+class SourceMap:
+    line_starts: List[int]
+
+    def __init__(self, code: Source) -> None:
+        self.code = code
+        newline: Any = '\n' if isinstance(code, str) else b'\n'
+        find = code.find
+        starts = [0]
+        p = find(newline)
+        while p != -1:
+            starts.append(p + 1)
+            p = find(newline, p + 1)
+        self.line_starts = starts
+
+    def location(self, index: int) -> Tuple[int, int]:
+        line = bisect_right(self.line_starts, index)
+        return line, index - self.line_starts[line - 1] + 1
+
+    def line_text(self, line: int) -> str:
+        start = self.line_starts[line - 1]
+        end = self.line_starts[line] - 1 if line < len(self.line_starts) else len(self.code)
+        text = self.code[start:end]
+        return text if isinstance(text, str) else bytes(text).decode(errors='replace')